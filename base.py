@@ -1,65 +1,79 @@
-from epyt import epanet
-from pymodbus.client import ModbusTcpClient
-from pymodbus.payload import BinaryPayloadDecoder, BinaryPayloadBuilder
-from pymodbus.constants import Endian
+import importlib
+import numpy as np
 
-class Epanet(epanet):
-    """This class extends the existing 'epanet' class with additional functionality
-    to get the relevant node and link values.
-    """
-    @property
-    def tank_heads(self) -> list[float]:
-        indices = self.getNodeTankIndex()
-        return [float(self.getNodeHydraulicHead(i)) for i in indices]
+# The simulation and Modbus classes live in their own modules and are only imported
+# on first use, so 'import watersim.base' does not load the EPANET library (epyt)
+# or pymodbus until a tool actually needs them.
+_LAZY = {
+    'Topology': 'watersim.simulation',
+    'Epanet': 'watersim.simulation',
+    'TOPOLOGY_EDITS': 'watersim.simulation',
+    'INPUT_EDITS': 'watersim.simulation',
+    'ModbusClient': 'watersim.client',
+    'AsyncModbusClient': 'watersim.client'
+}
 
-    @property
-    def tank_min_water_levels(self) -> list[float]:
-        indices = self.getNodeTankIndex()
-        return [float(self.getNodeTankMinimumWaterLevel(i)) for i in indices]
-    
-    @property
-    def tank_max_water_levels(self) -> list[float]:
-        indices = self.getNodeTankIndex()
-        return [float(self.getNodeTankMaximumWaterLevel(i)) for i in indices]
+def __getattr__(name: str):
+    if name not in _LAZY:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(importlib.import_module(_LAZY[name]), name)
+    globals()[name] = value
+    return value
 
-    @property
-    def pipe_statuses(self) -> list[int]:
-        indices = self.getLinkPipeIndex()
-        return [int(self.getLinkStatus(i)) for i in indices]
-   
-    @property
-    def pump_powers(self) -> list[float]:
-        indices = self.getLinkPumpIndex()
-        return [float(self.getLinkPumpPower(i)) for i in indices]
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
 
 class ReadFloatsResponse:
-    def __init__(self, floats: list[float]):
+    """The values of a float read, held in one NumPy float32 array.
+
+    Indexing, iteration and 'np.asarray(response)' work on the array directly, and
+    its memory is exposed through the buffer protocol ('memoryview(response.floats)',
+    or 'memoryview(response)' on Python 3.12+). A response can be passed back to a
+    read of the same count as 'out', which decodes into its array again instead of allocating a new
+    response, so steady-state polling allocates close to nothing.
+    """
+    __slots__ = ('floats',)
+
+    def __init__(self, floats: np.ndarray):
         self.floats = floats
-    
+
+    @classmethod
+    def empty(cls, count: int) -> 'ReadFloatsResponse':
+        """Returns a zeroed response of 'count' floats, for use as 'out'."""
+        return cls(np.zeros(count, dtype=np.float32))
+
+    def require(self, count: int) -> 'ReadFloatsResponse':
+        """Raises a 'ValueError' unless the response holds exactly 'count' floats, so a
+        response passed as 'out' is never returned with stale values at the end.
+        """
+        if len(self.floats) != count:
+            raise ValueError(f'{self} can\'t hold a read of {count} floats')
+        return self
+
+    def __len__(self) -> int:
+        return len(self.floats)
+
+    def __getitem__(self, index):
+        return self.floats[index]
+
+    def __iter__(self):
+        return iter(self.floats)
+
+    def __array__(self, dtype=None, copy=None) -> np.ndarray:
+        # NumPy 2 contract: copy=True always copies, copy=False never does (or raises).
+        if copy:
+            return self.floats.astype(self.floats.dtype if dtype is None else dtype)
+        if dtype is None or np.dtype(dtype) == self.floats.dtype:
+            return self.floats
+        if copy is False:
+            raise ValueError(f'Unable to avoid a copy while converting {self.floats.dtype} to {np.dtype(dtype)}')
+        return self.floats.astype(dtype)
+
+    def __buffer__(self, flags: int) -> memoryview:
+        return memoryview(self.floats)
+
     def __str__(self):
         return f'ReadFloatsResponse ({len(self.floats)})'
 
     def __repr__(self):
         return self.__str__()
-
-class ModbusClient(ModbusTcpClient):
-    """This class extends the existing 'ModbusTcpClient' class with additional functionality
-    for reading and writing float values.
-    """
-    def read_floats(self, address: int, count: int = 1, slave: int = 1) -> ReadFloatsResponse:
-        response = self.read_holding_registers(address, count * 2, slave=slave)
-        decoder = BinaryPayloadDecoder.fromRegisters(response.registers, byteorder=Endian.BIG, wordorder=Endian.LITTLE)
-        return ReadFloatsResponse([decoder.decode_32bit_float() for _ in range(count)])
-    
-    def write_float(self, address: int, value: float, slave: int = 1) -> None:
-        builder = BinaryPayloadBuilder(byteorder=Endian.BIG, wordorder=Endian.LITTLE)
-        builder.add_32bit_float(value)
-        registers = builder.to_registers()
-        self.write_registers(address, registers, slave=slave)
-
-    def write_floats(self, address: int, values: list[float], slave: int = 1) -> None:
-        builder = BinaryPayloadBuilder(byteorder=Endian.BIG, wordorder=Endian.LITTLE)
-        for value in values: 
-            builder.add_32bit_float(value)
-        registers = builder.to_registers()
-        self.write_registers(address, registers, slave=slave)
@@ -0,0 +1,115 @@
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import random
+import subprocess
+import tempfile
+import time
+import httpx
+import numpy as np
+
+class Result:
+    """Latencies (in seconds) and errors collected by one client."""
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+
+async def client(http: httpx.AsyncClient, args, deadline: float, post_ids: list[int], category_id: int, result: Result) -> None:
+    rng = random.Random()
+    while time.perf_counter() < deadline:
+        t = time.perf_counter()
+        try:
+            if rng.random() < args.write_ratio:
+                response = await http.post('/posts', json={'title': 'benchmark', 'content': 'x' * args.content, 'category_id': category_id})
+            else:
+                response = await http.get(f'/posts/{rng.choice(post_ids)}')
+            result.errors += response.status_code >= 400
+        except httpx.HTTPError:
+            result.errors += 1
+        result.latencies.append(time.perf_counter() - t)
+
+async def run(http: httpx.AsyncClient, args) -> list[Result]:
+    response = await http.post('/categories', json={'name': f'benchmark-{time.time_ns()}'})
+    category_id = response.json()['id']
+    post_ids = []
+    for _ in range(args.posts):
+        response = await http.post('/posts', json={'title': 'benchmark', 'content': 'x' * args.content, 'category_id': category_id})
+        post_ids.append(response.json()['id'])
+
+    results = [Result() for _ in range(args.clients)]
+    deadline = time.perf_counter() + args.duration
+    await asyncio.gather(*(client(http, args, deadline, post_ids, category_id, result) for result in results))
+    return results
+
+async def run_in_process(args) -> list[Result]:
+    # Each run gets a fresh database file, also for versions with a hard-coded relative url.
+    os.chdir(tempfile.mkdtemp(prefix='watersim-api-'))
+    os.environ.setdefault('DATABASE_URL', 'sqlite+aiosqlite:///./benchmark.db')
+    app = importlib.import_module(args.app).app
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://benchmark') as http:
+            return await run(http, args)
+
+async def run_remote(args) -> list[Result]:
+    limits = httpx.Limits(max_connections=args.clients)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits) as http:
+        return await run(http, args)
+
+def summarize(results: list[Result], duration: float) -> dict:
+    latencies = np.concatenate([np.asarray(result.latencies) for result in results] + [np.zeros(0)])
+    requests = latencies.size
+    errors = sum(result.errors for result in results)
+    p50, p99, p999 = np.percentile(latencies, [50, 99, 99.9]) * 1e3 if requests else (0.0, 0.0, 0.0)
+    return {
+        'requests': int(requests),
+        'throughput': requests / duration,
+        'p50_ms': float(p50),
+        'p99_ms': float(p99),
+        'p999_ms': float(p999),
+        'error_rate': errors / requests if requests else 0.0
+    }
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    """Measures requests/sec of the posts API under N concurrent clients.
+
+    By default the app is loaded in-process with a fresh SQLite database; pass --url
+    to measure a running server instead. Run it on two commits with --output to
+    compare before and after a change.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--app', default='watersim.fastapi', help='module with the FastAPI app, for in-process runs')
+    parser.add_argument('--url', help='base url of a running server')
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds')
+    parser.add_argument('--write-ratio', type=float, default=0.1)
+    parser.add_argument('--posts', type=int, default=200, help='posts created before the run')
+    parser.add_argument('--content', type=int, default=1000, help='bytes of content per post')
+    parser.add_argument('--output', help='save the results as JSON')
+    args = parser.parse_args()
+    commit = git_commit()
+    if args.output:
+        args.output = os.path.abspath(args.output)
+
+    results = asyncio.run(run_remote(args) if args.url else run_in_process(args))
+
+    summary = summarize(results, args.duration)
+    print(f"=== {args.clients} clients, write ratio {args.write_ratio} ===")
+    print(f"throughput: {summary['throughput']:.0f} req/s")
+    print(f"latency:    p50 {summary['p50_ms']:.2f} ms, p99 {summary['p99_ms']:.2f} ms, p999 {summary['p999_ms']:.2f} ms")
+    print(f"errors:     {summary['error_rate']:.2%}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'commit': commit, 'time': time.time(), 'config': vars(args), 'results': summary}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+from pymodbus.payload import BinaryPayloadDecoder, BinaryPayloadBuilder
+from pymodbus.constants import Endian
+from watersim.codec import RegisterCodec
+import numpy as np
+import timeit
+
+def decode_per_value(registers: list[int], count: int) -> list[float]:
+    decoder = BinaryPayloadDecoder.fromRegisters(registers, byteorder=Endian.BIG, wordorder=Endian.LITTLE)
+    return [decoder.decode_32bit_float() for _ in range(count)]
+
+def encode_per_value(values: list[float]) -> list[int]:
+    builder = BinaryPayloadBuilder(byteorder=Endian.BIG, wordorder=Endian.LITTLE)
+    for value in values:
+        builder.add_32bit_float(value)
+    return builder.to_registers()
+
+def main():
+    """Compares the per-value payload decoder/builder with the vectorized register codec.
+    """
+    codec = RegisterCodec('float32', 'little')
+
+    for count in (10, 100, 1000, 10000):
+        values = np.random.default_rng(0).uniform(-1e3, 1e3, count).astype(np.float32).tolist()
+        registers = encode_per_value(values)
+
+        assert codec.encode(values) == registers
+        assert codec.decode(registers).tolist() == decode_per_value(registers, count)
+
+        number = max(1, 10000 // count)
+        timings = {
+            'decode (per value)': timeit.timeit(lambda: decode_per_value(registers, count), number=number),
+            'decode (codec)': timeit.timeit(lambda: codec.decode(registers), number=number),
+            'encode (per value)': timeit.timeit(lambda: encode_per_value(values), number=number),
+            'encode (codec)': timeit.timeit(lambda: codec.encode(values), number=number)
+        }
+
+        print(f"=== {count} floats ===")
+        for name, seconds in timings.items():
+            print(f"{name:<20} {seconds / number * 1e6:>10.1f} us")
+
+if __name__ == '__main__':
+    main()
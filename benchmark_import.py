@@ -0,0 +1,76 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# Modules that are measured, with their import time budget in milliseconds and the
+# heavy dependencies they must not load at import time.
+TARGETS = {
+    'watersim.base': (250, ['epyt', 'pymodbus']),
+    'watersim.codec': (250, ['epyt', 'pymodbus']),
+    'watersim.register_map': (250, ['epyt', 'pymodbus']),
+    'watersim.recorder': (250, ['epyt', 'pymodbus']),
+    'watersim.publisher': (300, ['epyt', 'pymodbus']),
+    'watersim.scenarios': (300, ['epyt', 'pymodbus']),
+    'watersim.replay': (400, ['epyt', 'pymodbus']),
+    'watersim.client': (500, ['epyt']),
+    'watersim.simulation': (2500, ['pymodbus'])
+}
+
+def import_time(module: str) -> tuple[float, set[str]]:
+    """Imports 'module' in a fresh interpreter and returns its cumulative import time
+    in milliseconds and the names of all modules that were imported.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], cwd=root, capture_output=True, text=True, check=True)
+    cumulative, imported = None, set()
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, us, name = line.split('|')
+        imported.add(name.strip())
+        if name.strip() == module:
+            cumulative = int(us) / 1e3
+    return cumulative, imported
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    """Measures the import time of the watersim modules with 'python -X importtime' and
+    fails when a module is over its budget or imports a heavy dependency eagerly.
+    The eager imports alone are also checked by tests/test_imports.py.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--repeat', type=int, default=5, help='imports per module, the median is reported')
+    parser.add_argument('--scale', type=float, default=1.0, help='multiply all budgets, e.g. on slow machines')
+    parser.add_argument('--output', help='save the results as JSON')
+    args = parser.parse_args()
+
+    results, failures = {}, []
+    for module, (budget, forbidden) in TARGETS.items():
+        runs = [import_time(module) for _ in range(args.repeat)]
+        median = statistics.median(ms for ms, _ in runs)
+        loaded = sorted(name for name in forbidden if name in runs[0][1])
+        ok = median <= budget * args.scale and not loaded
+        results[module] = {'median_ms': median, 'budget_ms': budget * args.scale, 'eager_imports': loaded, 'ok': ok}
+        print(f"{'ok  ' if ok else 'FAIL'} {module:24} {median:8.1f} ms (budget {budget * args.scale:.0f} ms)" + (f", imports {', '.join(loaded)}" if loaded else ''))
+        if not ok:
+            failures.append(module)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'commit': git_commit(), 'time': time.time(), 'config': vars(args), 'results': results}, f, indent=2)
+
+    if failures:
+        print(f"=== {len(failures)} module(s) over budget or importing heavy dependencies ===")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
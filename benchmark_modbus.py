@@ -0,0 +1,139 @@
+from pyModbusTCP.server import ModbusServer
+from pyModbusTCP.client import ModbusClient
+from pymodbus.client import AsyncModbusTcpClient
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import threading
+import time
+import numpy as np
+
+class Result:
+    """Latencies (in seconds) and errors collected by one client."""
+    def __init__(self):
+        self.latencies = []
+        self.errors = 0
+
+def _pace(start: float, sent: int, rate: float) -> float:
+    # Seconds to wait before the next request to hold 'rate' requests per second.
+    return max(0.0, start + sent / rate - time.perf_counter()) if rate > 0 else 0.0
+
+def thread_client(args, stop: threading.Event, result: Result) -> None:
+    client = ModbusClient(host=args.host, port=args.port, unit_id=1, auto_open=True)
+    rng = random.Random()
+    start, sent = time.perf_counter(), 0
+    while not stop.is_set():
+        time.sleep(_pace(start, sent, args.rate))
+        t = time.perf_counter()
+        if rng.random() < args.write_ratio:
+            ok = client.write_multiple_registers(rng.randrange(args.registers - args.block), [rng.randrange(65536) for _ in range(args.block)])
+        else:
+            ok = client.read_holding_registers(rng.randrange(args.registers - args.block), args.block) is not None
+        result.latencies.append(time.perf_counter() - t)
+        result.errors += not ok
+        sent += 1
+    client.close()
+
+async def async_client(args, deadline: float, result: Result) -> None:
+    client = AsyncModbusTcpClient(args.host, port=args.port)
+    await client.connect()
+    rng = random.Random()
+    start, sent = time.perf_counter(), 0
+    while time.perf_counter() < deadline:
+        await asyncio.sleep(_pace(start, sent, args.rate))
+        t = time.perf_counter()
+        try:
+            if rng.random() < args.write_ratio:
+                response = await client.write_registers(rng.randrange(args.registers - args.block), [rng.randrange(65536) for _ in range(args.block)], slave=1)
+            else:
+                response = await client.read_holding_registers(rng.randrange(args.registers - args.block), args.block, slave=1)
+            result.errors += response.isError()
+        except Exception:
+            result.errors += 1
+        result.latencies.append(time.perf_counter() - t)
+        sent += 1
+    client.close()
+
+def run_threads(args) -> list[Result]:
+    stop = threading.Event()
+    results = [Result() for _ in range(args.clients)]
+    threads = [threading.Thread(target=thread_client, args=(args, stop, result)) for result in results]
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return results
+
+def run_asyncio(args) -> list[Result]:
+    async def run() -> list[Result]:
+        results = [Result() for _ in range(args.clients)]
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*(async_client(args, deadline, result) for result in results))
+        return results
+    return asyncio.run(run())
+
+def summarize(results: list[Result], duration: float) -> dict:
+    latencies = np.concatenate([np.asarray(result.latencies) for result in results] + [np.zeros(0)])
+    requests = latencies.size
+    errors = sum(result.errors for result in results)
+    p50, p99, p999 = np.percentile(latencies, [50, 99, 99.9]) * 1e3 if requests else (0.0, 0.0, 0.0)
+    return {
+        'requests': int(requests),
+        'throughput': requests / duration,
+        'p50_ms': float(p50),
+        'p99_ms': float(p99),
+        'p999_ms': float(p999),
+        'error_rate': errors / requests if requests else 0.0
+    }
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main():
+    """Starts a local Modbus server and measures it with N concurrent clients.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=5020)
+    parser.add_argument('--mode', choices=['threads', 'asyncio'], default='threads')
+    parser.add_argument('--clients', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=10.0, help='seconds')
+    parser.add_argument('--rate', type=float, default=0.0, help='requests per second per client, 0 for unlimited')
+    parser.add_argument('--write-ratio', type=float, default=0.1)
+    parser.add_argument('--block', type=int, default=100, help='registers per request')
+    parser.add_argument('--registers', type=int, default=1000, help='size of the address range used')
+    parser.add_argument('--no-server', action='store_true', help='use an already running server')
+    parser.add_argument('--output', help='save the results as JSON')
+    args = parser.parse_args()
+
+    server = None
+    if not args.no_server:
+        server = ModbusServer(host=args.host, port=args.port, no_block=True)
+        server.start()
+
+    try:
+        results = run_threads(args) if args.mode == 'threads' else run_asyncio(args)
+    finally:
+        if server is not None:
+            server.stop()
+
+    summary = summarize(results, args.duration)
+    print(f"=== {args.mode}: {args.clients} clients, block {args.block}, write ratio {args.write_ratio} ===")
+    print(f"throughput: {summary['throughput']:.0f} req/s")
+    print(f"latency:    p50 {summary['p50_ms']:.2f} ms, p99 {summary['p99_ms']:.2f} ms, p999 {summary['p999_ms']:.2f} ms")
+    print(f"errors:     {summary['error_rate']:.2%}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'commit': git_commit(), 'time': time.time(), 'config': vars(args), 'results': summary}, f, indent=2)
+
+if __name__ == '__main__':
+    main()
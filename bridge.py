@@ -0,0 +1,89 @@
+from typing import TYPE_CHECKING
+import threading
+import numpy as np
+from watersim.codec import RegisterCodec
+from watersim.databank import ChangeEvent, NotifyingDataBank
+from watersim.register_map import RegisterMap
+
+if TYPE_CHECKING:
+    from watersim.base import Epanet
+
+class Setpoint:
+    """A holding register range that clients write to change the network.
+
+    A written value is passed to 'Epanet.<method>(index, value)' before the next
+    hydraulic step, e.g. Setpoint(500, 'setLinkSettings', pump_index) or
+    Setpoint(502, 'setLinkStatus', pipe_index, dtype='uint16').
+    """
+    def __init__(self, address: int, method: str, index: int, dtype: str = 'float32', scale: float = 1.0, word_order: str = 'little'):
+        self.address = address
+        self.method = method
+        self.index = index
+        self.scale = scale
+        self.codec = RegisterCodec(dtype, word_order)
+        self.count = self.codec.registers_per_value
+
+    def __str__(self):
+        return f'Setpoint ({self.method}({self.index}) @ {self.address})'
+
+    def __repr__(self):
+        return self.__str__()
+
+class SimulationDataBank(NotifyingDataBank):
+    """This class extends 'NotifyingDataBank' to serve the simulation state straight from
+    the register image of a 'RegisterMap', without a client in between.
+
+    Each step is packed into a scratch buffer and then committed as an immutable image
+    by swapping a single reference, so a read always sees one complete step. Writes
+    to setpoint registers are queued as pending 'Epanet' changes (the last write per
+    setpoint wins) and applied by 'apply' from the simulation thread.
+    """
+    def __init__(self, register_map: RegisterMap, setpoints: list[Setpoint] = (), **kwargs):
+        super().__init__(**kwargs)
+        for setpoint in setpoints:
+            if setpoint.address < register_map.address + register_map.count and register_map.address < setpoint.address + setpoint.count:
+                raise ValueError(f'{setpoint} overlaps {register_map}')
+        self.register_map = register_map
+        self.setpoints = list(setpoints)
+        self._image = np.zeros(register_map.count, dtype='>u2').tobytes()
+        self._scratch = bytearray(register_map.count * 2)
+        self._changes = {}
+        self._changes_lock = threading.Lock()
+        self.add_listener(self._on_change)
+
+    def publish(self, snapshot: dict[str, dict[str, np.ndarray]]) -> None:
+        """Commits a snapshot as the image that clients read."""
+        self._image = bytes(self.register_map.pack(snapshot, out=self._scratch))
+
+    def get_holding_registers(self, address, number=1, srv_info=None):
+        # A read may cover plain registers (e.g. setpoints) on either side of the map.
+        first = max(address, self.register_map.address)
+        last = min(address + number, self.register_map.address + self.register_map.count)
+        if first >= last:
+            return super().get_holding_registers(address, number, srv_info=srv_info)
+        before = super().get_holding_registers(address, first - address, srv_info=srv_info) if first > address else []
+        after = super().get_holding_registers(last, address + number - last, srv_info=srv_info) if last < address + number else []
+        if before is None or after is None:
+            return None
+        image = self._image
+        mapped = np.frombuffer(image, dtype='>u2', count=last - first, offset=(first - self.register_map.address) * 2).tolist()
+        return before + mapped + after
+
+    def _on_change(self, event: ChangeEvent) -> None:
+        if event.space != 'holding_registers':
+            return
+        stop = event.address + len(event)
+        for setpoint in self.setpoints:
+            if setpoint.address < stop and event.address < setpoint.address + setpoint.count:
+                registers = super().get_holding_registers(setpoint.address, setpoint.count)
+                value = setpoint.codec.decode(registers)[0] / setpoint.scale
+                with self._changes_lock:
+                    self._changes[setpoint] = float(value)
+
+    def apply(self, d: 'Epanet') -> int:
+        """Applies the pending setpoint writes to 'd' and returns how many were applied."""
+        with self._changes_lock:
+            changes, self._changes = self._changes, {}
+        for setpoint, value in changes.items():
+            getattr(d, setpoint.method)(setpoint.index, value)
+        return len(changes)
@@ -0,0 +1,201 @@
+import asyncio
+import numpy as np
+import struct
+from pymodbus.client import AsyncModbusTcpClient, ModbusTcpClient
+from pymodbus.exceptions import ConnectionException, ModbusException, ModbusIOException
+from watersim.base import ReadFloatsResponse
+from watersim.codec import FLOAT32
+from watersim.metrics import METRICS
+
+# Errors of a failed or timed out request, after which the connection is reopened.
+IO_ERRORS = (ModbusException, OSError, asyncio.TimeoutError)
+
+class ModbusClient(ModbusTcpClient):
+    """This class extends the existing 'ModbusTcpClient' class with additional functionality
+    for reading and writing float values.
+
+    Reads and writes larger than a single Modbus request allows are split into
+    spec-compliant chunks. The chunks are sent back to back on the open connection,
+    each with its own transaction ID, and the responses are put back together in order.
+    """
+    MAX_READ_REGISTERS = 125
+    MAX_WRITE_REGISTERS = 123
+
+    def __init__(self, *args, max_in_flight: int = 16, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.max_in_flight = max_in_flight
+        self._scratch = bytearray()
+
+    def _receive_exactly(self, size: int) -> bytes:
+        data = self.recv(size)
+        if len(data) < size:
+            raise ModbusIOException(f'Expected {size} bytes, received {len(data)}')
+        return data
+
+    def _receive_response(self, pending: dict[int, int], responses: list) -> None:
+        tid, _, length, _ = struct.unpack('>HHHB', self._receive_exactly(7))
+        pdu = self._receive_exactly(length - 1)
+        if tid not in pending:
+            raise ModbusIOException(f'Unexpected transaction ID {tid}')
+        responses[pending.pop(tid)] = pdu
+
+    def _transact_pipelined(self, pdus: list[bytes], slave: int) -> list[bytes]:
+        if not self.connect():
+            raise ConnectionException(str(self))
+
+        responses = [None] * len(pdus)
+        pending = {}
+
+        try:
+            for position, pdu in enumerate(pdus):
+                if len(pending) >= self.max_in_flight:
+                    self._receive_response(pending, responses)
+                tid = self.transaction.getNextTID()
+                pending[tid] = position
+                self.send(struct.pack('>HHHB', tid, 0, len(pdu) + 1, slave) + pdu)
+
+            while pending:
+                self._receive_response(pending, responses)
+        except ModbusIOException:
+            # The stream can no longer be matched to requests, so start over on a new connection.
+            self.close()
+            raise
+
+        for pdu in responses:
+            if pdu[0] & 0x80:
+                raise ModbusException(f'Exception response {pdu[1]} to function code {pdu[0] & 0x7F}')
+
+        return responses
+
+    def read_register_bytes(self, address: int, count: int, slave: int = 1, out: bytearray = None) -> bytes:
+        """Reads 'count' holding registers and returns their raw big-endian payload.
+
+        With 'out' (a writable buffer of at least 2 * count bytes) the payload is
+        copied into it and a memoryview of the filled part is returned.
+        """
+        pdus = [
+            struct.pack('>BHH', 0x03, start, min(self.MAX_READ_REGISTERS, address + count - start))
+            for start in range(address, address + count, self.MAX_READ_REGISTERS)
+        ]
+        with METRICS.time('read'):
+            responses = self._transact_pipelined(pdus, slave)
+        if out is None:
+            return b''.join(pdu[2:] for pdu in responses)
+        view, offset = memoryview(out), 0
+        for pdu in responses:
+            view[offset:offset + len(pdu) - 2] = memoryview(pdu)[2:]
+            offset += len(pdu) - 2
+        return view[:offset]
+
+    def _write_pdus(self, address: int, data: bytes) -> list[bytes]:
+        size = self.MAX_WRITE_REGISTERS * 2
+        pdus = []
+        for offset in range(0, len(data), size):
+            chunk = data[offset:offset + size]
+            pdus.append(struct.pack('>BHHB', 0x10, address + offset // 2, len(chunk) // 2, len(chunk)) + chunk)
+        return pdus
+
+    def write_register_bytes(self, address: int, data: bytes, slave: int = 1) -> None:
+        """Writes a raw big-endian payload to consecutive holding registers."""
+        with METRICS.time('write'):
+            self._transact_pipelined(self._write_pdus(address, data), slave)
+
+    def write_register_ranges(self, ranges: list[tuple[int, bytes]], slave: int = 1) -> None:
+        """Writes several (address, payload) ranges, pipelined on the open connection."""
+        pdus = [pdu for address, data in ranges for pdu in self._write_pdus(address, data)]
+        if pdus:
+            with METRICS.time('write'):
+                self._transact_pipelined(pdus, slave)
+
+    def read_floats(self, address: int, count: int = 1, slave: int = 1, out: ReadFloatsResponse = None) -> ReadFloatsResponse:
+        """Reads 'count' floats. With 'out' (of exactly 'count' floats) they are decoded into
+        that response, which is returned.
+        """
+        if out is not None:
+            out.require(count)
+        # The payload goes through a scratch buffer that is kept between reads.
+        if len(self._scratch) < count * 4:
+            self._scratch = bytearray(count * 4)
+        data = self.read_register_bytes(address, count * 2, slave=slave, out=self._scratch)
+        with METRICS.time('decode'):
+            if out is None:
+                return ReadFloatsResponse(FLOAT32.decode_bytes(data))
+            FLOAT32.decode_bytes(data, out=out.floats)
+            return out
+    
+    def write_float(self, address: int, value: float, slave: int = 1) -> None:
+        self.write_registers(address, FLOAT32.encode([value]), slave=slave)
+
+    def write_floats(self, address: int, values: list[float], slave: int = 1) -> None:
+        with METRICS.time('encode'):
+            data = FLOAT32.encode_bytes(values)
+        self.write_register_bytes(address, data, slave=slave)
+
+class AsyncModbusClient(AsyncModbusTcpClient):
+    """This class extends the existing 'AsyncModbusTcpClient' class with the same float and
+    raw register functionality as 'ModbusClient', for use from asyncio code.
+
+    Large blocks are split into spec-compliant chunks that are issued concurrently,
+    with at most 'max_in_flight' outstanding requests.
+    """
+    def __init__(self, *args, max_in_flight: int = 16, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._in_flight = asyncio.Semaphore(max_in_flight)
+
+    async def _execute(self, method, *args, slave: int):
+        async with self._in_flight:
+            response = await method(*args, slave=slave)
+        if response.isError():
+            raise ModbusException(str(response))
+        return response
+
+    async def read_register_bytes(self, address: int, count: int, slave: int = 1, out: bytearray = None) -> bytes:
+        """Reads 'count' holding registers and returns their raw big-endian payload.
+
+        With 'out' (a writable buffer of at least 2 * count bytes) the payload is
+        copied into it and a memoryview of the filled part is returned.
+        """
+        size = ModbusClient.MAX_READ_REGISTERS
+        with METRICS.time('read'):
+            responses = await asyncio.gather(*(
+                self._execute(self.read_holding_registers, start, min(size, address + count - start), slave=slave)
+                for start in range(address, address + count, size)
+            ))
+        if out is None:
+            return b''.join(np.asarray(response.registers, dtype='>u2').tobytes() for response in responses)
+        words = np.frombuffer(out, dtype='>u2', count=count)
+        for i, response in enumerate(responses):
+            words[i * size:i * size + len(response.registers)] = response.registers
+        return memoryview(out)[:count * 2]
+
+    async def write_register_ranges(self, ranges: list[tuple[int, bytes]], slave: int = 1) -> None:
+        """Writes several (address, payload) ranges concurrently."""
+        size = ModbusClient.MAX_WRITE_REGISTERS * 2
+        with METRICS.time('write'):
+            await asyncio.gather(*(
+                self._execute(self.write_registers, address + offset // 2, np.frombuffer(data[offset:offset + size], dtype='>u2').tolist(), slave=slave)
+                for address, data in ranges
+                for offset in range(0, len(data), size)
+            ))
+
+    async def write_register_bytes(self, address: int, data: bytes, slave: int = 1) -> None:
+        """Writes a raw big-endian payload to consecutive holding registers."""
+        await self.write_register_ranges([(address, data)], slave=slave)
+
+    async def read_floats(self, address: int, count: int = 1, slave: int = 1, out: ReadFloatsResponse = None) -> ReadFloatsResponse:
+        """Reads 'count' floats. With 'out' (of exactly 'count' floats) they are decoded into
+        that response, which is returned.
+        """
+        if out is not None:
+            out.require(count)
+        data = await self.read_register_bytes(address, count * 2, slave=slave)
+        with METRICS.time('decode'):
+            if out is None:
+                return ReadFloatsResponse(FLOAT32.decode_bytes(data))
+            FLOAT32.decode_bytes(data, out=out.floats)
+            return out
+
+    async def write_floats(self, address: int, values: list[float], slave: int = 1) -> None:
+        with METRICS.time('encode'):
+            data = FLOAT32.encode_bytes(values)
+        await self.write_register_bytes(address, data, slave=slave)
@@ -0,0 +1,68 @@
+import numpy as np
+
+class RegisterCodec:
+    """This class converts between Modbus registers and NumPy arrays in a single
+    vectorized operation instead of decoding or encoding one value at a time.
+
+    Registers are big-endian 16-bit words. Values that span several registers are
+    stored with the given word order: 'big' puts the most significant word first,
+    'little' puts the least significant word first.
+    """
+    DTYPES = {
+        'int16': '>i2',
+        'uint16': '>u2',
+        'int32': '>i4',
+        'uint32': '>u4',
+        'float32': '>f4',
+        'float64': '>f8'
+    }
+
+    def __init__(self, dtype: str = 'float32', word_order: str = 'little'):
+        if dtype not in self.DTYPES:
+            raise ValueError(f'Unsupported dtype: {dtype}')
+        if word_order not in ('big', 'little'):
+            raise ValueError(f'Unsupported word order: {word_order}')
+        self.dtype = np.dtype(dtype)
+        self.wire_dtype = np.dtype(self.DTYPES[dtype])
+        self.word_order = word_order
+        self.registers_per_value = self.wire_dtype.itemsize // 2
+
+    def _swap_words(self, words: np.ndarray) -> np.ndarray:
+        if self.word_order == 'big' or self.registers_per_value == 1:
+            return words
+        return words.reshape(-1, self.registers_per_value)[:, ::-1]
+
+    def decode_bytes(self, data: bytes, out: np.ndarray = None) -> np.ndarray:
+        """Decodes a raw register payload (as found in a read response PDU).
+
+        With 'out' the values are written into the start of that array instead of a
+        new one, and the filled part of 'out' is returned.
+        """
+        words = self._swap_words(np.frombuffer(data, dtype='>u2'))
+        values = np.ascontiguousarray(words).view(self.wire_dtype).ravel()
+        if out is None:
+            return values.astype(self.dtype)
+        target = out if out.size == values.size else out[:values.size]
+        np.copyto(target, values)
+        return target
+
+    def decode(self, registers: list[int]) -> np.ndarray:
+        """Decodes a list of register values."""
+        return self.decode_bytes(np.asarray(registers, dtype='>u2').tobytes())
+
+    def encode_bytes(self, values) -> bytes:
+        """Encodes values into a raw register payload."""
+        words = np.asarray(values, dtype=self.wire_dtype).reshape(-1).view('>u2')
+        return np.ascontiguousarray(self._swap_words(words)).tobytes()
+
+    def encode(self, values) -> list[int]:
+        """Encodes values into a list of register values."""
+        return np.frombuffer(self.encode_bytes(values), dtype='>u2').tolist()
+
+    def __str__(self):
+        return f'RegisterCodec ({self.dtype}, {self.word_order} word order)'
+
+    def __repr__(self):
+        return self.__str__()
+
+FLOAT32 = RegisterCodec('float32', 'little')
@@ -0,0 +1,226 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from pyModbusTCP.server import DataBank
+
+class ChangeEvent:
+    """A client write that changed a contiguous range of coils or holding registers."""
+    def __init__(self, space: str, address: int, old_values: list, new_values: list):
+        self.space = space
+        self.address = address
+        self.old_values = old_values
+        self.new_values = new_values
+
+    def __len__(self) -> int:
+        return len(self.new_values)
+
+    def __str__(self):
+        return f'ChangeEvent ({self.space} {self.address}-{self.address + len(self) - 1})'
+
+    def __repr__(self):
+        return self.__str__()
+
+def _ranges(space: str, changes: dict[int, tuple]) -> list[ChangeEvent]:
+    events = []
+    for address in sorted(changes):
+        old_value, new_value = changes[address]
+        if events and events[-1].space == space and events[-1].address + len(events[-1]) == address:
+            events[-1].old_values.append(old_value)
+            events[-1].new_values.append(new_value)
+        else:
+            events.append(ChangeEvent(space, address, [old_value], [new_value]))
+    return events
+
+class NotifyingDataBank(DataBank):
+    """This class extends the existing 'DataBank' class to push client writes to listeners
+    instead of having them poll the data bank.
+
+    Every write request that changes values produces one 'ChangeEvent' per changed
+    contiguous range. With 'coalesce' set (in seconds), the changes of a burst of
+    writes are collected and delivered together once the window has passed; a
+    register that changed several times keeps its first old and last new value.
+    """
+    def __init__(self, *args, coalesce: float = 0.0, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.coalesce = coalesce
+        self._listeners = []
+        self._local = threading.local()
+        self._pending = {'coils': {}, 'holding_registers': {}}
+        self._pending_lock = threading.Lock()
+        self._timer = None
+
+    def add_listener(self, callback) -> None:
+        """Calls 'callback(event)' for every change event, from the server's threads."""
+        self._listeners.append(callback)
+
+    def remove_listener(self, callback) -> None:
+        self._listeners.remove(callback)
+
+    def subscribe(self, queue: asyncio.Queue, loop: asyncio.AbstractEventLoop) -> None:
+        """Puts every change event on an asyncio queue owned by 'loop'."""
+        self.add_listener(lambda event: loop.call_soon_threadsafe(queue.put_nowait, event))
+
+    def _notify(self, events: list[ChangeEvent]) -> None:
+        for event in events:
+            for callback in list(self._listeners):
+                callback(event)
+
+    def _flush(self) -> None:
+        with self._pending_lock:
+            pending, self._pending = self._pending, {'coils': {}, 'holding_registers': {}}
+            self._timer = None
+        self._notify([event for space, changes in pending.items() for event in _ranges(space, changes)])
+
+    def _record(self, space: str, changes: dict[int, tuple]) -> None:
+        if not changes:
+            return
+        if self.coalesce <= 0:
+            self._notify(_ranges(space, changes))
+            return
+        with self._pending_lock:
+            pending = self._pending[space]
+            for address, (old_value, new_value) in changes.items():
+                pending[address] = (pending.get(address, (old_value,))[0], new_value)
+            if self._timer is None:
+                self._timer = threading.Timer(self.coalesce, self._flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _collect(self, setter, address: int, values: list, srv_info) -> tuple[bool, dict[int, tuple]]:
+        # The base class reports every changed value of a client write through its
+        # on_*_change hooks; gather them per request to emit ranges.
+        self._local.changes = {}
+        try:
+            result = setter(address, values, srv_info=srv_info)
+            return result, self._local.changes
+        finally:
+            self._local.changes = None
+
+    def set_coils(self, address, bit_list, srv_info=None):
+        result, changes = self._collect(super().set_coils, address, bit_list, srv_info)
+        self._record('coils', changes)
+        return result
+
+    def set_holding_registers(self, address, word_list, srv_info=None):
+        result, changes = self._collect(super().set_holding_registers, address, word_list, srv_info)
+        self._record('holding_registers', changes)
+        return result
+
+    def on_coils_change(self, address, from_value, to_value, srv_info):
+        self._local.changes[address] = (from_value, to_value)
+
+    def on_holding_registers_change(self, address, from_value, to_value, srv_info):
+        self._local.changes[address] = (from_value, to_value)
+
+class SharedDataBank(DataBank):
+    """This class keeps the four Modbus data spaces in one 'multiprocessing.shared_memory'
+    block, so server worker processes can share a single data bank.
+
+    Without 'name' a new block of 'size' entries per space is created (the owner
+    unlinks it in 'close'); with 'name' and the owner's 'lock' an existing block is
+    attached from a child process. Writers are serialized by the lock and bump a
+    sequence number before and after every write (a seqlock); readers never lock,
+    but copy the range and retry while the sequence number was odd or changed, so
+    a multi-register read never mixes two writes. This relies on stores becoming
+    visible in program order, as on x86-64. The on_*_change hooks are not called.
+    """
+    HEADER = 64
+
+    def __init__(self, name: str = None, size: int = 0x10000, lock=None):
+        super().__init__(virtual_mode=True)
+        self.size = size
+        self.owner = name is None
+        self.lock = lock if lock is not None else multiprocessing.Lock()
+        total = self.HEADER + size * (1 + 1 + 2 + 2)
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=total)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.name = self.shm.name
+        self.coils_size = self.d_inputs_size = self.h_regs_size = self.i_regs_size = size
+
+        buffer, offset = self.shm.buf, self.HEADER
+        self._seq = np.ndarray((1,), dtype=np.uint64, buffer=buffer)
+        self._coils = np.ndarray((size,), dtype=np.uint8, buffer=buffer, offset=offset)
+        self._d_inputs = np.ndarray((size,), dtype=np.uint8, buffer=buffer, offset=offset + size)
+        self._h_regs = np.ndarray((size,), dtype=np.uint16, buffer=buffer, offset=offset + 2 * size)
+        self._i_regs = np.ndarray((size,), dtype=np.uint16, buffer=buffer, offset=offset + 4 * size)
+
+        self.reads = 0
+        self.writes = 0
+        self.retries = 0
+        self._stats_lock = threading.Lock()
+
+    def _read(self, space: np.ndarray, address: int, number: int) -> np.ndarray | None:
+        if address < 0 or address + number > space.size:
+            return None
+        retries = 0
+        while True:
+            start = int(self._seq[0])
+            if not start & 1:
+                values = space[address:address + number].copy()
+                if int(self._seq[0]) == start:
+                    break
+            retries += 1
+            if retries > 16:
+                # The writer may have been preempted mid-write; let it finish.
+                time.sleep(0)
+        with self._stats_lock:
+            self.reads += 1
+            self.retries += retries
+        return values
+
+    def _write(self, space: np.ndarray, address: int, values: np.ndarray) -> bool | None:
+        if address < 0 or address + len(values) > space.size:
+            return None
+        with self.lock:
+            self._seq[0] += 1
+            space[address:address + len(values)] = values
+            self._seq[0] += 1
+        with self._stats_lock:
+            self.writes += 1
+        return True
+
+    def get_coils(self, address, number=1, srv_info=None):
+        values = self._read(self._coils, address, number)
+        return None if values is None else values.astype(bool).tolist()
+
+    def get_discrete_inputs(self, address, number=1, srv_info=None):
+        values = self._read(self._d_inputs, address, number)
+        return None if values is None else values.astype(bool).tolist()
+
+    def get_holding_registers(self, address, number=1, srv_info=None):
+        values = self._read(self._h_regs, address, number)
+        return None if values is None else values.tolist()
+
+    def get_input_registers(self, address, number=1, srv_info=None):
+        values = self._read(self._i_regs, address, number)
+        return None if values is None else values.tolist()
+
+    def set_coils(self, address, bit_list, srv_info=None):
+        return self._write(self._coils, address, np.asarray([bool(b) for b in bit_list], dtype=np.uint8))
+
+    def set_discrete_inputs(self, address, bit_list):
+        return self._write(self._d_inputs, address, np.asarray([bool(b) for b in bit_list], dtype=np.uint8))
+
+    def set_holding_registers(self, address, word_list, srv_info=None):
+        return self._write(self._h_regs, address, (np.asarray(word_list, dtype=np.int64) & 0xFFFF).astype(np.uint16))
+
+    def set_input_registers(self, address, word_list):
+        return self._write(self._i_regs, address, (np.asarray(word_list, dtype=np.int64) & 0xFFFF).astype(np.uint16))
+
+    def close(self) -> None:
+        """Detaches from the block, and removes it when this is the owner."""
+        self._seq = self._coils = self._d_inputs = self._h_regs = self._i_regs = None
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __str__(self):
+        return f'SharedDataBank ({self.name}, {self.size} entries per space)'
+
+    def __repr__(self):
+        return self.__str__()
@@ -0,0 +1,176 @@
+from typing import TYPE_CHECKING
+import asyncio
+import math
+from concurrent.futures import ThreadPoolExecutor
+from watersim.bridge import SimulationDataBank
+from watersim.metrics import METRICS
+from watersim.publisher import DeltaPublisher
+from watersim.stepping import IncrementalStepper
+
+if TYPE_CHECKING:
+    from watersim.base import Epanet, AsyncModbusClient
+
+class SimulationDriver:
+    """This class runs the hydraulic simulation on a fixed-rate asyncio schedule.
+
+    Tick k starts at 'start + k * period', so the rate does not drift with the time
+    spent on I/O. A tick that runs past the start of the next one counts as a
+    deadline miss, and the schedule skips the ticks it fell behind on instead of
+    bursting to catch up. With 'period=None' the driver runs as fast as possible,
+    which is meant for batch runs.
+
+    The toolkit is only called from a single worker thread, while the Modbus writes
+    (through 'publisher') and the block reads in 'reads' run concurrently on the
+    event loop. 'on_tick' is called with the simulation time, the snapshot and the
+    results of the reads, or None for the reads of a tick whose I/O failed.
+
+    The Modbus I/O of a tick is abandoned a tenth of a period before the next tick
+    starts (or after 'io_timeout' seconds, if that comes first), so a slow server
+    can't hold up the simulation clock. A failed or timed out tick is counted in 'io_errors', and the next tick
+    reconnects first; the publisher resends whatever was not written.
+
+    With 'data_bank' the simulation serves an embedded Modbus server directly: pending
+    setpoint writes are applied before each step and the snapshot is committed to the
+    data bank right after it, on the simulation thread.
+
+    With 'stepper' the steps go through an 'IncrementalStepper', which skips the
+    solver while the network is steady. 'on_tick' then gets the time of the served
+    snapshot, which repeats while steps are skipped.
+    """
+    def __init__(self, d: 'Epanet', client: 'AsyncModbusClient' = None, publisher: DeltaPublisher = None,
+                 period: float | None = 1.0, reads: list[tuple[int, int]] = (), on_tick=None, slave: int = 1,
+                 data_bank: SimulationDataBank = None, stepper: IncrementalStepper = None, io_timeout: float = None):
+        self.d = d
+        self.stepper = stepper
+        self.client = client
+        self.publisher = publisher
+        self.data_bank = data_bank
+        self.period = period
+        self.reads = list(reads)
+        self.on_tick = on_tick
+        self.slave = slave
+        self.io_timeout = io_timeout
+        self._io_errors = ()
+        if client is not None:
+            # Only loaded with a client, which has already imported pymodbus.
+            from watersim.client import IO_ERRORS
+            self._io_errors = IO_ERRORS
+        self._reconnect = False
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='epanet')
+        self.ticks = 0
+        self.missed = 0
+        self.max_lateness = 0.0
+        self.io_errors = 0
+
+    def _open(self) -> None:
+        if self.stepper is not None:
+            self.stepper.open()
+            return
+        self.d.openHydraulicAnalysis()
+        self.d.initializeHydraulicAnalysis()
+
+    def _close(self) -> None:
+        if self.stepper is not None:
+            self.stepper.close()
+            return
+        self.d.closeHydraulicAnalysis()
+
+    def _step(self) -> tuple[int, dict]:
+        d = self.d
+        if self.stepper is not None:
+            if self.data_bank is not None:
+                self.data_bank.apply(d)
+            t = self.stepper.step()
+            snapshot = self.stepper.snapshot
+            if self.data_bank is not None:
+                self.data_bank.publish(snapshot)
+            return t, snapshot
+
+        # This code sets the simulation duration to run infinitely.
+        d.setTimeSimulationDuration(d.getTimeSimulationDuration() + d.getTimeHydraulicStep())
+        if self.data_bank is not None:
+            self.data_bank.apply(d)
+        with METRICS.time('solve'):
+            t = d.runHydraulicAnalysis()
+        METRICS.count('solves')
+        snapshot = d.snapshot()
+        if self.data_bank is not None:
+            self.data_bank.publish(snapshot)
+        d.nextHydraulicAnalysisStep()
+        return t, snapshot
+
+    async def _publish(self, snapshot: dict) -> None:
+        ranges = self.publisher.stage(snapshot)
+        await self.client.write_register_ranges(ranges, slave=self.slave)
+        self.publisher.commit()
+
+    async def _io(self, snapshot: dict) -> list[bytes]:
+        if self._reconnect:
+            self.client.close()
+            if not await self.client.connect():
+                raise ConnectionError(f'Could not reconnect to {self.client.comm_params.host}:{self.client.comm_params.port}')
+            self._reconnect = False
+        io = [self.client.read_register_bytes(address, count, slave=self.slave) for address, count in self.reads]
+        if self.publisher is not None:
+            io.append(self._publish(snapshot))
+        return (await asyncio.gather(*io))[:len(self.reads)]
+
+    async def tick(self, deadline: float = None) -> None:
+        """Runs one step and its I/O, which is abandoned at the loop time 'deadline'."""
+        loop = asyncio.get_running_loop()
+        t, snapshot = await loop.run_in_executor(self.executor, self._step)
+
+        reads = []
+        if self.client is not None:
+            timeout = self.io_timeout
+            if deadline is not None:
+                timeout = min(deadline - loop.time(), timeout if timeout is not None else math.inf)
+            try:
+                reads = await asyncio.wait_for(self._io(snapshot), timeout)
+            except self._io_errors:
+                reads = None
+                self.io_errors += 1
+                METRICS.count('io_errors')
+                self._reconnect = True
+
+        if self.on_tick is not None:
+            self.on_tick(t, snapshot, reads)
+
+    async def run(self, steps: int = None) -> None:
+        """Runs 'steps' ticks, or until cancelled when 'steps' is None."""
+        loop = asyncio.get_running_loop()
+        if self.client is not None and not self.client.connected:
+            await self.client.connect()
+
+        await loop.run_in_executor(self.executor, self._open)
+        try:
+            start = loop.time()
+            slot = 0
+            while steps is None or self.ticks < steps:
+                # Leave a tenth of the period to finish the tick after abandoned I/O.
+                await self.tick(start + (slot + 0.9) * self.period if self.period is not None else None)
+                self.ticks += 1
+                METRICS.count('ticks')
+
+                if self.period is None:
+                    await asyncio.sleep(0)
+                    continue
+
+                slot += 1
+                lateness = loop.time() - (start + slot * self.period)
+                if lateness > 0:
+                    self.missed += 1
+                    METRICS.count('deadline_misses')
+                    self.max_lateness = max(self.max_lateness, lateness)
+                    slot += math.floor(lateness / self.period) + 1
+                await asyncio.sleep(start + slot * self.period - loop.time())
+        finally:
+            await loop.run_in_executor(self.executor, self._close)
+            if self.client is not None:
+                self.client.close()
+
+    def __str__(self):
+        return f'SimulationDriver ({self.ticks} ticks, {self.missed} missed, max lateness {self.max_lateness:.3f} s, {self.io_errors} I/O errors)'
+
+    def __repr__(self):
+        return self.__str__()
@@ -1,23 +1,60 @@
 # import necessary modules
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, create_engine, MetaData
-from sqlalchemy.orm import sessionmaker, relationship, Session, declarative_base
+from sqlalchemy import Column, String, Integer, ForeignKey, DateTime, MetaData, event, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import relationship, declarative_base, selectinload
 from jose import jwt, JWTError
 from passlib.context import CryptContext
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict, ValidationError
 from datetime import datetime, timedelta, timezone
 from uuid import uuid4
+from contextlib import asynccontextmanager
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import hashlib
+import json
+import os
+import time
+
+# create database tables on startup
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    # one hashing pool per app lifetime, so the app can be started again in the same process
+    app.state.hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="bcrypt")  # bcrypt releases the gil, so threads run in parallel
+    try:
+        yield
+    finally:
+        await engine.dispose()
+        app.state.hash_executor.shutdown(wait=False)
 
 # initialize fastapi app
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # database configuration
-DATABASE_URL = "sqlite:///./test.db"  # sqlite database url
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite+aiosqlite:///./test.db")  # async database url, e.g. postgresql+asyncpg://... for postgres
+DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))  # connections kept open in the pool
+DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))  # extra connections allowed under load
+DB_POOL_TIMEOUT = 30  # seconds to wait for a free connection
 SECRET_KEY = "your_secret_key"  # secret key for jwt
 ALGORITHM = "HS256"  # algorithm for jwt
 ACCESS_TOKEN_EXPIRE_MINUTES = 30  # token expiration time
+HASH_WORKERS = int(os.environ.get("HASH_WORKERS", os.cpu_count() or 2))  # threads running bcrypt
+HASH_QUEUE_LIMIT = int(os.environ.get("HASH_QUEUE_LIMIT", 4 * HASH_WORKERS))  # password operations admitted at once
+TOKEN_CACHE_SIZE = 10000  # decoded tokens kept in memory
+PAGE_SIZE = 100  # default page size of list routes
+MAX_PAGE_SIZE = 1000  # largest page size of list routes
+EXPORT_BATCH_SIZE = 500  # rows fetched and sent per chunk by export routes
+BULK_BATCH_SIZE = 1000  # default rows per insert statement of bulk routes
+CACHE_SIZE = 10000  # entities kept in the in-process cache
+CACHE_TTL = {"user": 60, "category": 3600, "post": 300}  # seconds an entity is served from the cache
 
 # cors configuration
 origins = [
@@ -30,18 +67,40 @@ app.add_middleware(
     allow_origins=origins,
     allow_credentials=True,
     allow_methods=["*"],
-    allow_headers=["*"]
+    allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"]  # lets browsers read the keyset cursor of list routes
 )
 
 # database setup
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})  # create database engine
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)  # create session factory
+engine = create_async_engine(
+    DATABASE_URL,
+    pool_size=DB_POOL_SIZE,
+    max_overflow=DB_MAX_OVERFLOW,
+    pool_timeout=DB_POOL_TIMEOUT,
+    pool_pre_ping=not DATABASE_URL.startswith("sqlite")  # detect dropped server connections
+)  # create async database engine
+SessionLocal = async_sessionmaker(engine, autoflush=False, expire_on_commit=False)  # create async session factory
 metadata = MetaData()  # metadata for database
 Base = declarative_base()  # base class for orm models
 
+# sqlite connection setup
+@event.listens_for(engine.sync_engine, "connect")
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    if engine.dialect.name != "sqlite":
+        return
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")  # readers don't block the writer
+    cursor.execute("PRAGMA synchronous=NORMAL")  # fsync on checkpoints only, safe with wal
+    cursor.execute("PRAGMA busy_timeout=5000")  # wait for locks instead of failing
+    cursor.execute("PRAGMA cache_size=-20000")  # 20 mb page cache
+    cursor.execute("PRAGMA temp_store=MEMORY")  # temporary tables in memory
+    cursor.close()
+
 # password hashing setup
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")  # password context for hashing
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")  # oauth2 scheme for token
+hashing_stats = {"pending": 0, "max_pending": 0, "completed": 0, "failed": 0, "rejected": 0, "wait_seconds": 0.0}  # password hashing metrics
+token_cache = OrderedDict()  # token -> decoded payload, least recently used first
 
 # user model
 class User(Base):
@@ -75,16 +134,10 @@ class Post(Base):
     author = relationship("User")  # relationship to user
     category = relationship("Category")  # relationship to category
 
-# create database tables
-Base.metadata.create_all(bind=engine)
-
 # database session management
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with SessionLocal() as db:
         yield db
-    finally:
-        db.close()
 
 # password hashing function
 def hash_password(password: str) -> str:
@@ -94,6 +147,40 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+# run a password function on the hashing pool without blocking the event loop
+async def run_password_task(func, *args):
+    # reject instead of queueing without bound, so a login burst can't pile up minutes of work
+    if hashing_stats["pending"] >= HASH_QUEUE_LIMIT:
+        hashing_stats["rejected"] += 1
+        raise HTTPException(status_code=503, detail="server busy, try again later", headers={"Retry-After": "1"})
+    hashing_stats["pending"] += 1
+    hashing_stats["max_pending"] = max(hashing_stats["max_pending"], hashing_stats["pending"])
+    submitted = time.perf_counter()
+    started = []
+
+    def task():
+        started.append(time.perf_counter())
+        return func(*args)
+
+    try:
+        result = await asyncio.get_running_loop().run_in_executor(app.state.hash_executor, task)
+    except Exception:
+        hashing_stats["failed"] += 1
+        raise
+    finally:
+        hashing_stats["pending"] -= 1
+        hashing_stats["wait_seconds"] += (started[0] if started else time.perf_counter()) - submitted
+    hashing_stats["completed"] += 1
+    return result
+
+# async password hashing function
+async def hash_password_async(password: str) -> str:
+    return await run_password_task(hash_password, password)
+
+# async password verification function
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await run_password_task(verify_password, plain_password, hashed_password)
+
 # create jwt token function
 def create_access_token(data: dict, expires_delta: timedelta = None):
     to_encode = data.copy()
@@ -103,11 +190,137 @@ def create_access_token(data: dict, expires_delta: timedelta = None):
 
 # decode jwt token function
 def decode_access_token(token: str):
+    # serve repeated checks of the same token from the cache until it expires
+    cached = token_cache.get(token)
+    if cached is not None:
+        if cached.get("exp", 0) > time.time():
+            token_cache.move_to_end(token)
+            return cached
+        del token_cache[token]
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except JWTError:
         return None
+    token_cache[token] = payload
+    if len(token_cache) > TOKEN_CACHE_SIZE:
+        token_cache.popitem(last=False)
+    return payload
+
+# cache backend interface, implement it to share the cache between workers (e.g. redis)
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str):
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value, ttl: float):
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str):
+        ...
+
+    # counters version the cache keys (e.g. redis incr and mget); a backend may drop one, but a counter must never read lower than before
+    @abstractmethod
+    async def incr(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    async def counters(self, *keys: str) -> list[int]:
+        ...
+
+    def __len__(self):
+        return 0
+
+# in-process lru cache with a ttl per entry
+class MemoryCache(CacheBackend):
+    def __init__(self, max_size: int = CACHE_SIZE):
+        self.max_size = max_size
+        self.entries = OrderedDict()  # key -> (expires at, value), least recently used first
+        self.versions = OrderedDict()  # counter key -> value, least recently used first
+        self.clock = 0  # last value handed out by incr, shared by all counters
+        self.floor = 0  # highest evicted counter, read for counters that aren't kept
+
+    async def get(self, key: str):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry[1]
+
+    async def set(self, key: str, value, ttl: float):
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+    async def delete(self, key: str):
+        self.entries.pop(key, None)
+
+    # counters take their values from one clock, so an evicted counter reads the floor, which is at least its last value
+    async def incr(self, key: str) -> int:
+        self.clock += 1
+        self.versions[key] = self.clock
+        self.versions.move_to_end(key)
+        if len(self.versions) > self.max_size:
+            _, value = self.versions.popitem(last=False)
+            self.floor = max(self.floor, value)
+        return self.clock
+
+    async def counters(self, *keys: str) -> list[int]:
+        values = []
+        for key in keys:
+            if key in self.versions:
+                self.versions.move_to_end(key)
+            values.append(self.versions.get(key, self.floor))
+        return values
+
+    def __len__(self):
+        return len(self.entries)
+
+# entity cache setup
+cache = MemoryCache()  # replace with another CacheBackend to share it
+cache_stats = {"hits": 0, "misses": 0, "not_modified": 0, "invalidations": 0}  # entity cache metrics
+
+# cache key of an entity, versioned by the generation of its kind and its own version in the backend
+async def cache_key(kind: str, entity_id) -> str:
+    generation, version = await cache.counters(f"generation:{kind}", f"version:{kind}:{entity_id}")
+    return f"{kind}:{generation}:{entity_id}:{version}"
+
+# drop a cached entity after it changed
+async def invalidate(kind: str, entity_id):
+    cache_stats["invalidations"] += 1
+    key = await cache_key(kind, entity_id)
+    await cache.incr(f"version:{kind}:{entity_id}")
+    await cache.delete(key)
+
+# drop every cached entity of a kind, e.g. posts embedding a changed category
+async def invalidate_all(kind: str):
+    cache_stats["invalidations"] += 1
+    await cache.incr(f"generation:{kind}")
+
+# read-through cache: serve the cached json body, or load, serialize and cache it
+async def cached_response(request: Request, kind: str, entity_id, load):
+    # the key is taken before loading, so a load that races an invalidation is stored under the old key
+    key = await cache_key(kind, entity_id)
+    entry = await cache.get(key)
+    if entry is None:
+        cache_stats["misses"] += 1
+        body = (await load()).model_dump_json().encode()
+        entry = ('"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"', body)
+        await cache.set(key, entry, CACHE_TTL[kind])
+    else:
+        cache_stats["hits"] += 1
+    etag, body = entry
+    # a client holding the same version gets an empty 304
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))):
+        cache_stats["not_modified"] += 1
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(body, media_type="application/json", headers={"ETag": etag})
 
 # pydantic models for request validation
 class UserCreate(BaseModel):
@@ -127,164 +340,369 @@ class UserLogin(BaseModel):
     username: str
     password: str
 
+# pydantic models for responses, only these columns are loaded and returned
+class UserOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: str
+    username: str
+    email: str
+    role: str | None
+    created_at: datetime | None
+    updated_at: datetime | None
+
+class AuthorOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: str
+    username: str
+
+class CategoryOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    name: str
+    created_at: datetime | None
+    updated_at: datetime | None
+
+class PostOut(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+    id: int
+    title: str
+    content: str
+    author_id: str | None
+    category_id: int | None
+    created_at: datetime | None
+    updated_at: datetime | None
+
+class PostDetailOut(PostOut):
+    author: AuthorOut | None
+    category: CategoryOut | None
+
+# select only the columns of a response model
+def project(model, schema):
+    return select(*(getattr(model, name) for name in schema.model_fields))
+
+# posts with their author and category, loaded in one query per relationship instead of one per post
+def select_post_details():
+    return select(Post).options(
+        selectinload(Post.author).load_only(User.id, User.username),
+        selectinload(Post.category)
+    )
+
+# keyset pagination: rows after the cursor in primary key order, the next cursor goes in a header
+async def fetch_page(db: AsyncSession, statement, model, after, limit: int, response: Response, scalars: bool = False):
+    if after is not None:
+        statement = statement.where(model.id > after)
+    statement = statement.order_by(model.id).limit(limit)
+    result = await db.scalars(statement) if scalars else await db.execute(statement)
+    rows = result.all()
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return rows
+
+# stream a table as a json array, a batch of rows at a time
+def stream_json(statement, schema, scalars: bool = False):
+    async def generate():
+        async with SessionLocal() as db:
+            result = await db.stream(statement.execution_options(yield_per=EXPORT_BATCH_SIZE))
+            if scalars:
+                result = result.scalars()
+            separator = "["
+            async for batch in result.partitions(EXPORT_BATCH_SIZE):
+                yield separator + ",".join(schema.model_validate(row).model_dump_json() for row in batch)
+                separator = ","
+            yield "[]" if separator == "[" else "]"
+    return StreamingResponse(generate(), media_type="application/json")
+
+# items of a bulk request: a json array, or one json object per line for ndjson
+async def read_bulk_items(request: Request):
+    if request.headers.get("content-type", "").startswith(("application/x-ndjson", "application/jsonl")):
+        # parse the stream line by line, so large imports are never held in memory at once
+        buffer = b""
+        async for chunk in request.stream():
+            *lines, buffer = (buffer + chunk).split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if buffer.strip():
+            yield buffer
+        return
+    try:
+        items = json.loads(await request.body())
+    except ValueError:
+        raise HTTPException(status_code=400, detail="body must be a json array or ndjson")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="body must be a json array or ndjson")
+    for item in items:
+        yield item
+
+# validate and insert the items of a bulk request in batches, all in one transaction
+# new ids can't be in the entity cache yet, so nothing is invalidated
+async def bulk_create(request: Request, db: AsyncSession, schema, model, batch_size: int, prepare=None):
+    results, batch = [], []
+
+    async def flush():
+        rows = [row for _, row in batch]
+        if prepare is not None:
+            rows = await prepare(rows)
+        # one executemany per batch, the new ids come back from returning instead of a re-query
+        ids = (await db.scalars(insert(model).returning(model.id, sort_by_parameter_order=True), rows)).all()
+        results.extend({"index": index, "id": new_id} for (index, _), new_id in zip(batch, ids))
+        batch.clear()
+
+    try:
+        index = 0
+        async for item in read_bulk_items(request):
+            try:
+                data = schema.model_validate_json(item) if isinstance(item, bytes) else schema.model_validate(item)
+            except ValidationError as e:
+                results.append({"index": index, "error": json.loads(e.json(include_url=False))})
+            else:
+                batch.append((index, data.model_dump()))
+                if len(batch) >= batch_size:
+                    await flush()
+            index += 1
+        if batch:
+            await flush()
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        raise HTTPException(status_code=409, detail=f"nothing was created: {e.orig}")
+
+    results.sort(key=lambda result: result["index"])
+    created = sum("id" in result for result in results)
+    return {"created": created, "failed": len(results) - created, "results": results}
+
+# hash the passwords of a batch of new users, a few at a time to stay within the hashing queue limit
+async def hash_passwords(rows: list[dict]) -> list[dict]:
+    for start in range(0, len(rows), HASH_WORKERS):
+        chunk = rows[start:start + HASH_WORKERS]
+        hashed = await asyncio.gather(*(hash_password_async(row["password"]) for row in chunk))
+        for row, password in zip(chunk, hashed):
+            row["password"] = password
+    return rows
+
 # login route
 @app.post("/login")
-async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
+async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
+    user = (await db.scalars(select(User).where(User.username == form_data.username))).first()
     if not user:
         raise HTTPException(status_code=401, detail="incorrect username or password")
-    if not verify_password(form_data.password, user.password):
+    if not await verify_password_async(form_data.password, user.password):
         raise HTTPException(status_code=401, detail="incorrect username or password")
     access_token = create_access_token(data={"sub": user.id})
     return {"access_token": access_token, "token_type": "bearer"}
 
 # registration route
-@app.post("/register")
-async def register(user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.username == user.username).first()
+@app.post("/register", response_model=UserOut)
+async def register(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = (await db.scalars(select(User).where(User.username == user.username))).first()
     if db_user:
         raise HTTPException(status_code=400, detail="username already registered")
-    hashed_password = hash_password(user.password)
+    hashed_password = await hash_password_async(user.password)
     new_user = User(username=user.username, email=user.email, password=hashed_password)
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    await db.commit()
+    await db.refresh(new_user)
     return new_user
 
+# password hashing metrics route
+@app.get("/metrics/hashing")
+async def get_hashing_metrics():
+    return {
+        **hashing_stats,
+        "workers": HASH_WORKERS,
+        "queue_limit": HASH_QUEUE_LIMIT,
+        "queue_depth": max(0, hashing_stats["pending"] - HASH_WORKERS),
+        "token_cache_size": len(token_cache)
+    }
+
+# entity cache metrics route
+@app.get("/metrics/cache")
+async def get_cache_metrics():
+    lookups = cache_stats["hits"] + cache_stats["misses"]
+    return {
+        **cache_stats,
+        "hit_rate": cache_stats["hits"] / lookups if lookups else 0.0,
+        "size": len(cache)
+    }
+
 # get all users route
-@app.get("/users")
-async def get_users(db: Session = Depends(get_db)):
-    users = db.query(User).all()
-    return users
+@app.get("/users", response_model=list[UserOut])
+async def get_users(response: Response, after: str = None, limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: AsyncSession = Depends(get_db)):
+    return await fetch_page(db, project(User, UserOut), User, after, limit, response)
+
+# export all users route
+@app.get("/users/export", response_model=list[UserOut])
+async def export_users():
+    return stream_json(project(User, UserOut).order_by(User.id), UserOut)
 
 # get single user route
-@app.get("/users/{user_id}")
-async def get_user(user_id: str, db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
-        raise HTTPException(status_code=404, detail="user not found")
-    return user
+@app.get("/users/{user_id}", response_model=UserOut)
+async def get_user(user_id: str, request: Request, db: AsyncSession = Depends(get_db)):
+    async def load():
+        user = (await db.execute(project(User, UserOut).where(User.id == user_id))).first()
+        if not user:
+            raise HTTPException(status_code=404, detail="user not found")
+        return UserOut.model_validate(user)
+    return await cached_response(request, "user", user_id, load)
 
 # create user route
-@app.post("/users")
-async def create_user(user: UserCreate, db: Session = Depends(get_db)):
-    hashed_password = hash_password(user.password)
+@app.post("/users", response_model=UserOut)
+async def create_user(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    hashed_password = await hash_password_async(user.password)
     db_user = User(username=user.username, email=user.email, password=hashed_password)
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    await invalidate("user", db_user.id)
     return db_user
 
+# bulk create users route
+@app.post("/users/bulk")
+async def create_users_bulk(request: Request, batch_size: int = Query(BULK_BATCH_SIZE, ge=1, le=10000), db: AsyncSession = Depends(get_db)):
+    return await bulk_create(request, db, UserCreate, User, batch_size, prepare=hash_passwords)
+
 # update user route
-@app.put("/users/{user_id}")
-async def update_user(user_id: str, user: UserCreate, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.id == user_id).first()
+@app.put("/users/{user_id}", response_model=UserOut)
+async def update_user(user_id: str, user: UserCreate, db: AsyncSession = Depends(get_db)):
+    db_user = (await db.scalars(select(User).where(User.id == user_id))).first()
     if not db_user:
         raise HTTPException(status_code=404, detail="user not found")
     db_user.username = user.username
     db_user.email = user.email
-    db_user.password = hash_password(user.password)
+    db_user.password = await hash_password_async(user.password)
     db_user.updated_at = datetime.now(tz=timezone.utc)
-    db.commit()
+    await db.commit()
+    await invalidate("user", user_id)
+    await invalidate_all("post")  # posts embed their author
     return db_user
 
 # delete user route
 @app.delete("/users/{user_id}")
-async def delete_user(user_id: str, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.id == user_id).first()
+async def delete_user(user_id: str, db: AsyncSession = Depends(get_db)):
+    db_user = (await db.scalars(select(User).where(User.id == user_id))).first()
     if not db_user:
         raise HTTPException(status_code=404, detail="user not found")
-    db.delete(db_user)
-    db.commit()
+    await db.delete(db_user)
+    await db.commit()
+    await invalidate("user", user_id)
+    await invalidate_all("post")  # posts embed their author
     return {"message": "user deleted"}
 
 # get all categories route
-@app.get("/categories")
-async def get_categories(db: Session = Depends(get_db)):
-    categories = db.query(Category).all()
-    return categories
+@app.get("/categories", response_model=list[CategoryOut])
+async def get_categories(response: Response, after: int = None, limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: AsyncSession = Depends(get_db)):
+    return await fetch_page(db, project(Category, CategoryOut), Category, after, limit, response)
+
+# export all categories route
+@app.get("/categories/export", response_model=list[CategoryOut])
+async def export_categories():
+    return stream_json(project(Category, CategoryOut).order_by(Category.id), CategoryOut)
 
 # get single category route
-@app.get("/categories/{category_id}")
-async def get_category(category_id: int, db: Session = Depends(get_db)):
-    category = db.query(Category).filter(Category.id == category_id).first()
-    if not category:
-        raise HTTPException(status_code=404, detail="category not found")
-    return category
+@app.get("/categories/{category_id}", response_model=CategoryOut)
+async def get_category(category_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    async def load():
+        category = (await db.execute(project(Category, CategoryOut).where(Category.id == category_id))).first()
+        if not category:
+            raise HTTPException(status_code=404, detail="category not found")
+        return CategoryOut.model_validate(category)
+    return await cached_response(request, "category", category_id, load)
 
 # create category route
-@app.post("/categories")
-async def create_category(category: CategoryCreate, db: Session = Depends(get_db)):
+@app.post("/categories", response_model=CategoryOut)
+async def create_category(category: CategoryCreate, db: AsyncSession = Depends(get_db)):
     new_category = Category(name=category.name)
     db.add(new_category)
-    db.commit()
-    db.refresh(new_category)
+    await db.commit()
+    await db.refresh(new_category)
     return new_category
 
+# bulk create categories route
+@app.post("/categories/bulk")
+async def create_categories_bulk(request: Request, batch_size: int = Query(BULK_BATCH_SIZE, ge=1, le=10000), db: AsyncSession = Depends(get_db)):
+    return await bulk_create(request, db, CategoryCreate, Category, batch_size)
+
 # update category route
-@app.put("/categories/{category_id}")
-async def update_category(category_id: int, category: CategoryCreate, db: Session = Depends(get_db)):
-    db_category = db.query(Category).filter(Category.id == category_id).first()
+@app.put("/categories/{category_id}", response_model=CategoryOut)
+async def update_category(category_id: int, category: CategoryCreate, db: AsyncSession = Depends(get_db)):
+    db_category = (await db.scalars(select(Category).where(Category.id == category_id))).first()
     if not db_category:
         raise HTTPException(status_code=404, detail="category not found")
     db_category.name = category.name
     db_category.updated_at = datetime.now(tz=timezone.utc)
-    db.commit()
+    await db.commit()
+    await invalidate("category", category_id)
+    await invalidate_all("post")  # posts embed their category
     return db_category
 
 # delete category route
 @app.delete("/categories/{category_id}")
-async def delete_category(category_id: int, db: Session = Depends(get_db)):
-    db_category = db.query(Category).filter(Category.id == category_id).first()
+async def delete_category(category_id: int, db: AsyncSession = Depends(get_db)):
+    db_category = (await db.scalars(select(Category).where(Category.id == category_id))).first()
     if not db_category:
         raise HTTPException(status_code=404, detail="category not found")
-    db.delete(db_category)
-    db.commit()
+    await db.delete(db_category)
+    await db.commit()
+    await invalidate("category", category_id)
+    await invalidate_all("post")  # posts embed their category
     return {"message": "category deleted"}
 
 # get all posts route
-@app.get("/posts")
-async def get_posts(db: Session = Depends(get_db)):
-    posts = db.query(Post).all()
-    return posts
+@app.get("/posts", response_model=list[PostDetailOut])
+async def get_posts(response: Response, after: int = None, limit: int = Query(PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: AsyncSession = Depends(get_db)):
+    return await fetch_page(db, select_post_details(), Post, after, limit, response, scalars=True)
+
+# export all posts route
+@app.get("/posts/export", response_model=list[PostOut])
+async def export_posts():
+    return stream_json(project(Post, PostOut).order_by(Post.id), PostOut)
 
 # get single post route
-@app.get("/posts/{post_id}")
-async def get_post(post_id: int, db: Session = Depends(get_db)):
-    post = db.query(Post).filter(Post.id == post_id).first()
-    if not post:
-        raise HTTPException(status_code=404, detail="post not found")
-    return post
+@app.get("/posts/{post_id}", response_model=PostDetailOut)
+async def get_post(post_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    async def load():
+        post = (await db.scalars(select_post_details().where(Post.id == post_id))).first()
+        if not post:
+            raise HTTPException(status_code=404, detail="post not found")
+        return PostDetailOut.model_validate(post)
+    return await cached_response(request, "post", post_id, load)
 
 # create post route
-@app.post("/posts")
-async def create_post(post: PostCreate, db: Session = Depends(get_db)):
+@app.post("/posts", response_model=PostOut)
+async def create_post(post: PostCreate, db: AsyncSession = Depends(get_db)):
     new_post = Post(title=post.title, content=post.content, category_id=post.category_id)
     db.add(new_post)
-    db.commit()
-    db.refresh(new_post)
+    await db.commit()
+    await db.refresh(new_post)
     return new_post
 
+# bulk create posts route
+@app.post("/posts/bulk")
+async def create_posts_bulk(request: Request, batch_size: int = Query(BULK_BATCH_SIZE, ge=1, le=10000), db: AsyncSession = Depends(get_db)):
+    return await bulk_create(request, db, PostCreate, Post, batch_size)
+
 # update post route
-@app.put("/posts/{post_id}")
-async def update_post(post_id: int, post: PostCreate, db: Session = Depends(get_db)):
-    db_post = db.query(Post).filter(Post.id == post_id).first()
+@app.put("/posts/{post_id}", response_model=PostOut)
+async def update_post(post_id: int, post: PostCreate, db: AsyncSession = Depends(get_db)):
+    db_post = (await db.scalars(select(Post).where(Post.id == post_id))).first()
     if not db_post:
         raise HTTPException(status_code=404, detail="post not found")
     db_post.title = post.title
     db_post.content = post.content
     db_post.category_id = post.category_id
     db_post.updated_at = datetime.now(tz=timezone.utc)
-    db.commit()
+    await db.commit()
+    await invalidate("post", post_id)
     return db_post
 
 # delete post route
 @app.delete("/posts/{post_id}")
-async def delete_post(post_id: int, db: Session = Depends(get_db)):
-    db_post = db.query(Post).filter(Post.id == post_id).first()
+async def delete_post(post_id: int, db: AsyncSession = Depends(get_db)):
+    db_post = (await db.scalars(select(Post).where(Post.id == post_id))).first()
     if not db_post:
         raise HTTPException(status_code=404, detail="post not found")
-    db.delete(db_post)
-    db.commit()
+    await db.delete(db_post)
+    await db.commit()
+    await invalidate("post", post_id)
     return {"message": "post deleted"}
 
@@ -1,5 +1,46 @@
-from watersim.base import Epanet, ModbusClient
-import time
+from watersim.base import Epanet, AsyncModbusClient
+from watersim.register_map import RegisterMap
+from watersim.publisher import DeltaPublisher
+from watersim.driver import SimulationDriver
+from watersim.recorder import Recorder
+from watersim.codec import FLOAT32
+from watersim.metrics import METRICS, MetricsServer
+import asyncio
+
+def print_tick(t: int, snapshot: dict, reads: list[bytes]) -> None:
+    print(t, end=' ')
+    print(FLOAT32.decode_bytes(reads[0]) if reads is not None else 'I/O failed')
+    print(snapshot['tank']['head'])
+    print(snapshot['tank']['min_level'])
+    print(snapshot['tank']['max_level'])
+    print(snapshot['pipe']['status'])
+    print(snapshot['pump']['power'])
+
+async def simulate(d: Epanet) -> None:
+    # The asyncio client has to be created inside the running event loop.
+    client = AsyncModbusClient(host='127.0.0.1', port=502)
+    publisher = DeltaPublisher(None, RegisterMap(d), deadbands={'node.pressure': 0.01, 'node.head': 0.01})
+
+    recorder = Recorder('recordings/test', d)
+
+    # Stage timings are served on http://127.0.0.1:9108/metrics; leave them disabled to skip the timing.
+    METRICS.enable()
+    metrics_server = MetricsServer(METRICS, port=9108)
+    metrics_server.start()
+
+    def on_tick(t: int, snapshot: dict, reads: list[bytes]) -> None:
+        recorder.append(t, snapshot)
+        print_tick(t, snapshot, reads)
+
+    # Set 'period=None' to run as fast as possible.
+    driver = SimulationDriver(d, client, publisher, period=1.0, reads=[(0, 8)], on_tick=on_tick)
+
+    try:
+        await driver.run()
+    finally:
+        recorder.close()
+        metrics_server.stop()
+        print(driver)
 
 def main():
     """Runs a hydraulic simulation.
@@ -7,55 +48,15 @@ def main():
     d = Epanet('networks/test.inp')
     d.setTimeSimulationDuration(60 * 20)
     d.setTimeHydraulicStep(60 * 10)
-    
-    client = ModbusClient(host='127.0.0.1', port=502)
-    client.connect()
 
     try:
-        d.openHydraulicAnalysis()
-        d.initializeHydraulicAnalysis()
-
-        while True:
-            # This code sets the simulation duration to run infinitely.
-            x = d.getTimeSimulationDuration() + d.getTimeHydraulicStep()
-            d.setTimeSimulationDuration(x)
-            
-            d.runHydraulicAnalysis()
-
-            # tstep = d.runHydraulicAnalysis()
-            # print(tstep, end=' ')
-            
-            # if tstep >= d.getTimeSimulationDuration():
-            #     break 
-
-            # LOGIC HERE ############################################################
-                
-            f = client.read_floats(0, 4)
-            print(f)
-            print(f.floats)
-            hr = client.read_holding_registers(0, 4)
-            print(hr)
-            print(hr.registers)
-
-            print(d.tank_heads)
-            print(d.tank_min_water_levels)
-            print(d.tank_max_water_levels)
-            print(d.pipe_statuses)
-            print(d.pump_powers)
-
-            # END ###################################################################
-
-            d.nextHydraulicAnalysisStep()
-
-            time.sleep(1)  
+        asyncio.run(simulate(d))
 
     except KeyboardInterrupt:
         print('>--- Program interrupted by user ---')
     
     finally:
-        d.closeHydraulicAnalysis()         
         d.unload()
-        client.close()
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,190 @@
+import bisect
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Upper bounds (in seconds) of the latency buckets, from 10 us to 10 s.
+DEFAULT_BUCKETS = (1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 2.5e-3, 5e-3, 1e-2, 2.5e-2, 5e-2, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class Histogram:
+    """A latency histogram with fixed buckets, as Prometheus expects them."""
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum += value
+            self.count += 1
+
+    def cumulative(self) -> list[tuple[float, int]]:
+        """Returns the (upper bound, cumulative count) of every bucket, ending with +Inf."""
+        with self._lock:
+            counts = list(self.counts)
+        result, total = [], 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def __str__(self):
+        mean = self.sum / self.count * 1e3 if self.count else 0.0
+        return f'Histogram ({self.count} observations, mean {mean:.3f} ms)'
+
+    def __repr__(self):
+        return self.__str__()
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+_NULL_TIMER = _NullTimer()
+
+class Metrics:
+    """This class collects per-stage timings and event counters of the simulation loop.
+
+    Stages are timed with 'with METRICS.time("solve"): ...' and aggregated into one
+    histogram per stage; events are counted with 'METRICS.count("ticks")'. While
+    disabled, 'time' returns a shared no-op context manager and 'count' returns right
+    away, so the instrumentation can stay in the hot path.
+    """
+    def __init__(self, enabled: bool = False, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = buckets
+        self.stages = {}
+        self.counters = {}
+        self._lock = threading.Lock()
+
+    def enable(self) -> None:
+        self.enabled = True
+
+    def disable(self) -> None:
+        self.enabled = False
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stages = {}
+            self.counters = {}
+
+    def histogram(self, stage: str) -> Histogram:
+        histogram = self.stages.get(stage)
+        if histogram is None:
+            with self._lock:
+                histogram = self.stages.setdefault(stage, Histogram(self.buckets))
+        return histogram
+
+    def time(self, stage: str):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self.histogram(stage))
+
+    def observe(self, stage: str, seconds: float) -> None:
+        if self.enabled:
+            self.histogram(stage).observe(seconds)
+
+    def count(self, event: str, n: int = 1) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self.counters[event] = self.counters.get(event, 0) + n
+
+    def to_prometheus(self, prefix: str = 'watersim') -> str:
+        """Returns all metrics in the Prometheus text exposition format."""
+        with self._lock:
+            stages = dict(self.stages)
+            counters = dict(self.counters)
+
+        lines = [
+            f'# HELP {prefix}_stage_seconds Time spent per stage of the simulation loop.',
+            f'# TYPE {prefix}_stage_seconds histogram'
+        ]
+        for stage, histogram in sorted(stages.items()):
+            for bound, total in histogram.cumulative():
+                le = '+Inf' if bound == float('inf') else repr(bound)
+                lines.append(f'{prefix}_stage_seconds_bucket{{stage="{stage}",le="{le}"}} {total}')
+            lines.append(f'{prefix}_stage_seconds_sum{{stage="{stage}"}} {histogram.sum!r}')
+            lines.append(f'{prefix}_stage_seconds_count{{stage="{stage}"}} {histogram.count}')
+
+        lines.append(f'# HELP {prefix}_events_total Events counted in the simulation loop.')
+        lines.append(f'# TYPE {prefix}_events_total counter')
+        for event, total in sorted(counters.items()):
+            lines.append(f'{prefix}_events_total{{event="{event}"}} {total}')
+        return '\n'.join(lines) + '\n'
+
+    def __str__(self):
+        return f"Metrics ({'enabled' if self.enabled else 'disabled'}, {len(self.stages)} stages, {len(self.counters)} counters)"
+
+    def __repr__(self):
+        return self.__str__()
+
+# The process-wide metrics used by the instrumented modules. Disabled until enabled.
+METRICS = Metrics()
+
+class MetricsServer:
+    """This class serves 'metrics' in the Prometheus text format on
+    'http://host:port/metrics' from a daemon thread.
+    """
+    def __init__(self, metrics: Metrics = METRICS, host: str = '127.0.0.1', port: int = 9108):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    def start(self) -> None:
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name='metrics', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    def __str__(self):
+        return f'MetricsServer (http://{self.host}:{self.port}/metrics)'
+
+    def __repr__(self):
+        return self.__str__()
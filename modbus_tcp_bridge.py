@@ -0,0 +1,42 @@
+from pyModbusTCP.server import ModbusServer
+from watersim.base import Epanet
+from watersim.bridge import Setpoint, SimulationDataBank
+from watersim.driver import SimulationDriver
+from watersim.register_map import RegisterMap
+import asyncio
+
+def main():
+    """Runs a hydraulic simulation that serves its state from an embedded Modbus server.
+    """
+    d = Epanet('networks/test.inp')
+    d.setTimeSimulationDuration(60 * 20)
+    d.setTimeHydraulicStep(60 * 10)
+
+    register_map = RegisterMap(d)
+    # One writable setting register pair per pump, right after the mapped state.
+    setpoints = [
+        Setpoint(register_map.address + register_map.count + 2 * i, 'setLinkSettings', int(index))
+        for i, index in enumerate(d.topology.links_by_type['pump'])
+    ]
+    data_bank = SimulationDataBank(register_map, setpoints)
+    server = ModbusServer(host='127.0.0.1', port=502, no_block=True, data_bank=data_bank)
+
+    try:
+        server.start()
+        if server.is_run:
+            print("=== Modbus server started successfully ===")
+            print("Status: \033[92mRunning\033[0m")
+
+            driver = SimulationDriver(d, data_bank=data_bank, period=1.0)
+            asyncio.run(driver.run())
+
+    except KeyboardInterrupt:
+        print(">--- Program interrupted by user ---")
+
+    finally:
+        server.stop()
+        d.unload()
+        print("Status: \033[91mStopped\033[0m")
+
+if __name__ == '__main__':
+    main()
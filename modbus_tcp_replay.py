@@ -0,0 +1,41 @@
+from pyModbusTCP.server import ModbusServer
+from watersim.recorder import Recording
+from watersim.register_map import RegisterMap
+from watersim.replay import Replayer
+import argparse
+
+def main():
+    """Serves a recorded simulation run from the Modbus server, without EPANET.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('recording', help='directory written by the recorder')
+    parser.add_argument('--speed', type=float, default=1.0, help='playback speed, 0 for as fast as possible')
+    parser.add_argument('--rate', type=float, default=10.0, help='data bank updates per second')
+    parser.add_argument('--loop', action='store_true')
+    parser.add_argument('--no-interpolate', action='store_true')
+    args = parser.parse_args()
+
+    recording = Recording(args.recording)
+    register_map = RegisterMap.from_groups(recording.groups())
+
+    try:
+        server = ModbusServer(host='127.0.0.1', port=502, no_block=True)
+        server.start()
+        if server.is_run:
+            print("=== Modbus server started successfully ===")
+            print("Status: \033[92mRunning\033[0m")
+
+            replayer = Replayer(recording, register_map, server.data_bank, speed=args.speed or None,
+                                rate=args.rate, loop=args.loop, interpolate=not args.no_interpolate)
+            replayer.run()
+            print(replayer)
+
+    except KeyboardInterrupt:
+        print(">--- Program interrupted by user ---")
+
+    finally:
+        server.stop()
+        print("Status: \033[91mStopped\033[0m")
+    
+if __name__ == '__main__':
+    main()
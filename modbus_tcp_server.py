@@ -1,10 +1,42 @@
 from pyModbusTCP.server import ModbusServer
+from watersim.databank import ChangeEvent, NotifyingDataBank, SharedDataBank
+from watersim.multiserver import MultiProcessServer
+import argparse
 import time
 
-def main():
+def print_change(event: ChangeEvent) -> None:
+    print(f"{event.space} @ {event.address}: {event.old_values} -> {event.new_values}")
+
+def print_stats(server: MultiProcessServer) -> None:
+    for i, stats in enumerate(server.stats()):
+        print(f"worker {i} (pid {stats['pid']}): {stats['reads']} reads, {stats['writes']} writes, {stats['retries']} retries")
 
+def run_workers(args) -> None:
+    data_bank = SharedDataBank()
+    server = MultiProcessServer(data_bank, host=args.host, port=args.port, workers=args.workers)
+    try:
+        server.start()
+        print(f"=== Modbus server started with {server.workers} worker processes ===")
+        print("Status: \033[92mRunning\033[0m")
+
+        data_bank.set_discrete_inputs(0, [False]*100)
+        data_bank.set_coils(0, [False]*100)
+        data_bank.set_input_registers(0, [0]*100)
+        data_bank.set_holding_registers(0, [0]*100)
+
+        # Client writes land in other processes, so only the per-worker counters are shown.
+        while 1:
+            time.sleep(5)
+            print_stats(server)
+
+    finally:
+        server.stop()
+        data_bank.close()
+
+def run_server(args) -> None:
+    data_bank = NotifyingDataBank(coalesce=0.01)
+    server = ModbusServer(host=args.host, port=args.port, no_block=True, data_bank=data_bank)
     try:
-        server = ModbusServer(host='127.0.0.1', port=502, no_block=True)
         server.start()
         if server.is_run:
             print("=== Modbus server started successfully ===")
@@ -15,24 +47,35 @@ def main():
             server.data_bank.set_input_registers(0, [0]*100)
             server.data_bank.set_holding_registers(0, [0]*100)
 
+            # Client writes are pushed to the listener, so there is nothing to poll.
+            data_bank.add_listener(print_change)
+
             while 1:
-                # di = server.data_bank.get_discrete_inputs(0, 100)
-                # co = server.data_bank.get_coils(0, 100)
-                # ir = server.data_bank.get_input_registers(0, 100)
-                hr = server.data_bank.get_holding_registers(0, 100)
+                time.sleep(1)
+
+    finally:
+        server.stop()
 
-                # print(f"di: {di[:10]}")
-                # print(f"co: {co[:10]}")
-                # print(f"ir: {ir[:10]}")
-                print(f"hr: {hr[:10]}")
+def main():
+    """Runs a Modbus TCP server, in one process or in several worker processes that
+    share one data bank and accept on the same port.
+    """
+    parser = argparse.ArgumentParser(description=main.__doc__)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=502)
+    parser.add_argument('--workers', type=int, default=1, help='worker processes, more than 1 uses SO_REUSEPORT and a shared memory data bank')
+    args = parser.parse_args()
 
-                time.sleep(5)
+    try:
+        if args.workers > 1:
+            run_workers(args)
+        else:
+            run_server(args)
 
     except KeyboardInterrupt:
         print(">--- Program interrupted by user ---")
 
     finally:
-        server.stop()
         print("Status: \033[91mStopped\033[0m")
     
 if __name__ == '__main__':
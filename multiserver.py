@@ -0,0 +1,157 @@
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import socketserver
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from pyModbusTCP.server import ModbusServer
+from watersim.databank import SharedDataBank
+
+# Per-worker counters, one row per worker in a shared memory block.
+STATS = ('pid', 'reads', 'writes', 'retries')
+
+def _serve(index: int, host: str, port: int, name: str, size: int, lock, stats_name: str, workers: int, stop, interval: float, ready) -> None:
+    # Ctrl+C reaches the whole process group; the parent stops the workers.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    # Every worker binds its own listening socket to the same port, and the kernel
+    # spreads incoming connections over them.
+    socketserver.ThreadingTCPServer.allow_reuse_port = True
+    data_bank, stats_shm, stats, server = None, None, None, None
+    try:
+        try:
+            data_bank = SharedDataBank(name, size, lock)
+            stats_shm = shared_memory.SharedMemory(name=stats_name)
+            stats = np.ndarray((workers, len(STATS)), dtype=np.uint64, buffer=stats_shm.buf)
+            server = ModbusServer(host=host, port=port, no_block=True, data_bank=data_bank)
+            server.start()
+        except Exception as error:
+            ready.put((index, f'{type(error).__name__}: {error}'))
+            return
+        stats[index, 0] = os.getpid()
+        ready.put((index, None))
+        while not stop.wait(interval):
+            stats[index, 1:] = (data_bank.reads, data_bank.writes, data_bank.retries)
+        stats[index, 1:] = (data_bank.reads, data_bank.writes, data_bank.retries)
+    finally:
+        if server is not None:
+            server.stop()
+        stats = None
+        if stats_shm is not None:
+            stats_shm.close()
+        if data_bank is not None:
+            data_bank.close()
+
+class MultiProcessServer:
+    """This class serves one 'SharedDataBank' from several 'ModbusServer' worker processes
+    that all accept on the same port (SO_REUSEPORT), so request handling scales with
+    the number of cores instead of sharing one GIL.
+
+    The calling process keeps the data bank and can read and write it directly while
+    the workers run. Each worker publishes its read, write and seqlock retry counts
+    every 'interval' seconds; 'stats' returns them per worker. 'start' raises a
+    'ModbusServer.NetworkError' when the port is already in use, as a single
+    'ModbusServer' would, instead of sharing it with another server; it returns once
+    every worker is listening, and raises a 'RuntimeError' (after stopping the
+    others) when one of them fails to come up.
+    """
+    def __init__(self, data_bank: SharedDataBank, host: str = '127.0.0.1', port: int = 502, workers: int = None, interval: float = 1.0):
+        self.data_bank = data_bank
+        self.host = host
+        self.port = port
+        self.workers = workers or os.cpu_count() or 1
+        self.interval = interval
+        self._stop = multiprocessing.Event()
+        self._processes = []
+        self._stats_shm = None
+        self._stats = None
+
+    @property
+    def is_run(self) -> bool:
+        return any(process.is_alive() for process in self._processes)
+
+    def _check_port(self) -> None:
+        # SO_REUSEPORT would let the workers join the listeners of another server (and its
+        # data bank) without an error, so first bind a socket without it.
+        # Two servers that start at the same moment can still both get through.
+        probe = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        try:
+            probe.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            probe.bind((self.host, self.port))
+        except OSError as error:
+            raise ModbusServer.NetworkError(error)
+        finally:
+            probe.close()
+
+    def start(self, timeout: float = 10.0) -> None:
+        self._check_port()
+        self._stats_shm = shared_memory.SharedMemory(create=True, size=self.workers * len(STATS) * 8)
+        self._stats = np.ndarray((self.workers, len(STATS)), dtype=np.uint64, buffer=self._stats_shm.buf)
+        self._stats[:] = 0
+        self._stop.clear()
+        ready = multiprocessing.Queue()
+        self._processes = [
+            multiprocessing.Process(
+                target=_serve,
+                args=(i, self.host, self.port, self.data_bank.name, self.data_bank.size, self.data_bank.lock,
+                      self._stats_shm.name, self.workers, self._stop, self.interval, ready),
+                name=f'modbus-worker-{i}',
+                daemon=True
+            )
+            for i in range(self.workers)
+        ]
+        for process in self._processes:
+            process.start()
+
+        errors = self._wait_ready(ready, timeout)
+        if errors:
+            self.stop()
+            raise RuntimeError(f'{self} failed to start: ' + '; '.join(errors))
+
+    def _wait_ready(self, ready, timeout: float) -> list[str]:
+        errors, pending = [], set(range(self.workers))
+        deadline = time.monotonic() + timeout
+        while pending:
+            try:
+                index, error = ready.get(timeout=min(0.1, max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                # A worker that died before reporting never sends anything.
+                dead = [i for i in pending if not self._processes[i].is_alive()]
+                for i in dead:
+                    errors.append(f'{self._processes[i].name} exited with code {self._processes[i].exitcode}')
+                    pending.discard(i)
+                if pending and time.monotonic() >= deadline:
+                    errors.extend(f'{self._processes[i].name} did not start within {timeout} s' for i in sorted(pending))
+                    break
+                continue
+            pending.discard(index)
+            if error is not None:
+                errors.append(f'{self._processes[index].name}: {error}')
+        return errors
+
+    def stats(self) -> list[dict[str, int]]:
+        """Returns the last published counters of every worker."""
+        if self._stats is None:
+            return []
+        return [dict(zip(STATS, row)) for row in self._stats.tolist()]
+
+    def stop(self) -> None:
+        self._stop.set()
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        if self._stats_shm is not None:
+            self._stats = None
+            self._stats_shm.close()
+            self._stats_shm.unlink()
+            self._stats_shm = None
+
+    def __str__(self):
+        return f'MultiProcessServer ({self.host}:{self.port}, {self.workers} workers)'
+
+    def __repr__(self):
+        return self.__str__()
@@ -0,0 +1,156 @@
+import threading
+import time
+from contextlib import contextmanager
+from pymodbus.exceptions import ConnectionException, ModbusException, ModbusIOException
+from watersim.base import ModbusClient, ReadFloatsResponse
+from watersim.codec import FLOAT32
+
+class Device:
+    """The pooled connections to one (host, port, unit id)."""
+    def __init__(self, host: str, port: int, slave: int, size: int):
+        self.host = host
+        self.port = port
+        self.slave = slave
+        self.slots = threading.BoundedSemaphore(size)
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def __str__(self):
+        return f'Device ({self.host}:{self.port}/{self.slave}, {len(self.idle)} idle)'
+
+    def __repr__(self):
+        return self.__str__()
+
+class ConnectionPool:
+    """This class shares a small, fixed set of 'ModbusClient' connections per device
+    between threads.
+
+    At most 'size' requests run concurrently per device; further callers wait for a
+    free connection. Connections that have been idle for 'keepalive' seconds are
+    probed by reading one register at 'probe_address', and dropped when the probe
+    fails, so half-open sockets are found before a caller uses them. Reads are
+    idempotent, so a read that fails on a broken connection is retried on a fresh
+    one with exponential backoff; writes reconnect but are not retried.
+    """
+    def __init__(self, size: int = 2, keepalive: float = 30.0, retries: int = 3, backoff: float = 0.1,
+                 max_backoff: float = 5.0, probe_address: int = 0, timeout: float = 3.0):
+        self.size = size
+        self.keepalive = keepalive
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.probe_address = probe_address
+        self.timeout = timeout
+        self.devices = {}
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._prober = threading.Thread(target=self._probe_loop, name='modbus-keepalive', daemon=True)
+        self._prober.start()
+
+    def _device(self, host: str, port: int, slave: int) -> Device:
+        key = (host, port, slave)
+        with self._lock:
+            if key not in self.devices:
+                self.devices[key] = Device(host, port, slave, self.size)
+            return self.devices[key]
+
+    def _release(self, device: Device, client: ModbusClient) -> None:
+        with device.lock:
+            if len(device.idle) < self.size:
+                device.idle.append((client, time.monotonic()))
+                return
+        client.close()
+
+    @contextmanager
+    def connection(self, host: str, port: int = 502, slave: int = 1):
+        """Checks out a connected client for (host, port, slave)."""
+        device = self._device(host, port, slave)
+        device.slots.acquire()
+        client, healthy = None, True
+        try:
+            with device.lock:
+                if device.idle:
+                    client = device.idle.pop()[0]
+            if client is None:
+                client = ModbusClient(host=host, port=port, timeout=self.timeout)
+            if not client.connect():
+                raise ConnectionException(f'{device}')
+            yield client
+        except (ConnectionException, ModbusIOException, OSError):
+            healthy = False
+            raise
+        finally:
+            if client is not None:
+                if healthy:
+                    self._release(device, client)
+                else:
+                    client.close()
+            device.slots.release()
+
+    def _retrying(self, host: str, port: int, slave: int, request):
+        for attempt in range(self.retries + 1):
+            try:
+                with self.connection(host, port, slave) as client:
+                    return request(client)
+            except (ConnectionException, ModbusIOException, OSError):
+                if attempt == self.retries:
+                    raise
+                time.sleep(min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def read_register_bytes(self, host: str, port: int, address: int, count: int, slave: int = 1) -> bytes:
+        return self._retrying(host, port, slave, lambda client: client.read_register_bytes(address, count, slave=slave))
+
+    def read_floats(self, host: str, port: int, address: int, count: int = 1, slave: int = 1, out: ReadFloatsResponse = None) -> ReadFloatsResponse:
+        if out is not None:
+            out.require(count)
+        data = self.read_register_bytes(host, port, address, count * 2, slave=slave)
+        if out is None:
+            return ReadFloatsResponse(FLOAT32.decode_bytes(data))
+        FLOAT32.decode_bytes(data, out=out.floats)
+        return out
+
+    def write_register_bytes(self, host: str, port: int, address: int, data: bytes, slave: int = 1) -> None:
+        with self.connection(host, port, slave) as client:
+            client.write_register_bytes(address, data, slave=slave)
+
+    def write_floats(self, host: str, port: int, address: int, values: list[float], slave: int = 1) -> None:
+        self.write_register_bytes(host, port, address, FLOAT32.encode_bytes(values), slave=slave)
+
+    def _probe(self, device: Device) -> None:
+        now = time.monotonic()
+        with device.lock:
+            stale = [entry for entry in device.idle if now - entry[1] >= self.keepalive]
+            device.idle = [entry for entry in device.idle if now - entry[1] < self.keepalive]
+        for client, _ in stale:
+            try:
+                client.read_register_bytes(self.probe_address, 1, slave=device.slave)
+            except (ConnectionException, ModbusIOException, OSError):
+                client.close()
+                continue
+            except ModbusException:
+                # An exception response still proves the connection is alive.
+                pass
+            self._release(device, client)
+
+    def _probe_loop(self) -> None:
+        while not self._closed.wait(self.keepalive / 2):
+            with self._lock:
+                devices = list(self.devices.values())
+            for device in devices:
+                self._probe(device)
+
+    def close(self) -> None:
+        self._closed.set()
+        with self._lock:
+            devices, self.devices = list(self.devices.values()), {}
+        for device in devices:
+            with device.lock:
+                for client, _ in device.idle:
+                    client.close()
+                device.idle = []
+
+    def __str__(self):
+        return f'ConnectionPool ({len(self.devices)} devices, {self.size} connections each)'
+
+    def __repr__(self):
+        return self.__str__()
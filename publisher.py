@@ -0,0 +1,105 @@
+from typing import TYPE_CHECKING
+import numpy as np
+from watersim.metrics import METRICS
+from watersim.register_map import RegisterMap
+
+if TYPE_CHECKING:
+    from watersim.base import ModbusClient
+
+class DeltaPublisher:
+    """This class publishes snapshots through a register map, but only writes the
+    registers that changed since the last published image.
+
+    'deadbands' maps 'group.quantity' (e.g. 'tank.head') to the smallest change that
+    is published; smaller changes keep the previously published value. Dirty
+    registers that are at most 'max_gap' registers apart are merged into one write,
+    because resending a few unchanged registers is cheaper than another request.
+
+    'publish' writes through the given client. Asynchronous callers can leave the
+    client out, write the ranges from 'stage' themselves and then call 'commit'.
+    """
+    def __init__(self, client: 'ModbusClient | None', register_map: RegisterMap, deadbands: dict[str, float] = None, max_gap: int = 8, slave: int = 1):
+        self.client = client
+        self.register_map = register_map
+        self.deadbands = deadbands or {}
+        self.max_gap = max_gap
+        self.slave = slave
+        self.image = None
+        self.values = {}
+        self.writes = 0
+        self.registers_written = 0
+        self._staged = None
+
+    def reset(self) -> None:
+        """Forgets the published image, so the next 'publish' writes everything."""
+        self.image = None
+        self.values = {}
+
+    def _apply_deadbands(self, snapshot: dict[str, dict[str, np.ndarray]]) -> dict[str, np.ndarray]:
+        published = {}
+        for block in self.register_map.blocks:
+            field = block.field
+            key = f'{field.group}.{field.quantity}'
+            values = np.asarray(snapshot[field.group][field.quantity], dtype=float)
+            last = self.values.get(key)
+            deadband = self.deadbands.get(key)
+            if last is not None and deadband is not None:
+                values = np.where(np.abs(values - last) > deadband, values, last)
+            published[key] = values
+        return published
+
+    def dirty_ranges(self, image: bytes) -> list[tuple[int, int]]:
+        """Returns the (start, stop) register offsets that differ from the published image."""
+        if self.image is None:
+            return [(0, self.register_map.count)] if self.register_map.count else []
+
+        changed = np.flatnonzero(np.frombuffer(image, dtype='>u2') != np.frombuffer(self.image, dtype='>u2'))
+        if changed.size == 0:
+            return []
+
+        # Split wherever two dirty registers are more than 'max_gap' registers apart.
+        breaks = np.flatnonzero(np.diff(changed) > self.max_gap + 1)
+        starts = np.concatenate(([changed[0]], changed[breaks + 1]))
+        stops = np.concatenate((changed[breaks], [changed[-1]])) + 1
+        return list(zip(starts.tolist(), stops.tolist()))
+
+    def stage(self, snapshot: dict[str, dict[str, np.ndarray]]) -> list[tuple[int, bytes]]:
+        """Returns the (address, payload) ranges to write for a snapshot.
+
+        The ranges only become the published image after 'commit', so a failed write
+        is retried in full on the next step.
+        """
+        with METRICS.time('encode'):
+            values = self._apply_deadbands(snapshot)
+            published = {}
+            for key, value in values.items():
+                group, quantity = key.split('.')
+                published.setdefault(group, {})[quantity] = value
+
+            image = bytes(self.register_map.pack(published))
+            ranges = self.dirty_ranges(image)
+        address = self.register_map.address
+
+        self._staged = (image, values, ranges)
+        return [(address + start, image[start * 2:stop * 2]) for start, stop in ranges]
+
+    def commit(self) -> None:
+        """Marks the last staged ranges as written."""
+        self.image, self.values, ranges = self._staged
+        self.writes += len(ranges)
+        registers = sum(stop - start for start, stop in ranges)
+        self.registers_written += registers
+        METRICS.count('registers_written', registers)
+
+    def publish(self, snapshot: dict[str, dict[str, np.ndarray]]) -> list[tuple[int, int]]:
+        """Writes the changed parts of a snapshot and returns the written (address, count) ranges."""
+        ranges = self.stage(snapshot)
+        self.client.write_register_ranges(ranges, slave=self.slave)
+        self.commit()
+        return [(address, len(data) // 2) for address, data in ranges]
+
+    def __str__(self):
+        return f'DeltaPublisher ({self.writes} writes, {self.registers_written} registers)'
+
+    def __repr__(self):
+        return self.__str__()
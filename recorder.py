@@ -0,0 +1,162 @@
+from typing import TYPE_CHECKING
+import json
+import os
+import numpy as np
+
+if TYPE_CHECKING:
+    from watersim.base import Epanet
+
+class Recorder:
+    """This class appends per-step snapshots to a columnar recording on disk.
+
+    A recording is a directory with 'meta.json', 'time.bin' and one raw file per
+    'group.quantity' holding a (steps x elements) array. The files are preallocated
+    for 'capacity' steps, memory-mapped, and doubled in size when full. Steps are
+    kept in a buffer of at most 'buffer_rows' rows and written out in one go, and
+    'meta.json' only counts rows that have been flushed. Groups without elements
+    are not recorded.
+    """
+    def __init__(self, path: str, d: 'Epanet', capacity: int = 1024, buffer_rows: int = 64, dtype: str = 'float32'):
+        self.path = path
+        self.topology = d.topology
+        self.capacity = capacity
+        self.buffer_rows = buffer_rows
+        self.dtype = np.dtype(dtype)
+        self.rows = 0
+        self.columns = None
+        self._maps = {}
+        self._buffer = []
+        os.makedirs(path, exist_ok=True)
+
+    def _create(self, snapshot: dict[str, dict[str, np.ndarray]]) -> None:
+        self.columns = {}
+        for group, values in snapshot.items():
+            name_ids = self.topology.node_name_ids if group in ('node', *self.topology.nodes_by_type) else self.topology.link_name_ids
+            elements = [name_ids[i - 1] for i in values['index'].tolist()]
+            if not elements:
+                continue
+            for quantity in values:
+                if quantity != 'index':
+                    self.columns[f'{group}.{quantity}'] = {
+                        'file': f'{group}.{quantity}.bin',
+                        'dtype': self.dtype.str,
+                        'elements': elements,
+                        'indices': values['index'].tolist()
+                    }
+        self.columns['time'] = {'file': 'time.bin', 'dtype': np.dtype(np.int64).str, 'elements': [], 'indices': []}
+        self._open(self.capacity)
+
+    def _open(self, capacity: int) -> None:
+        self._maps = {}
+        for name, column in self.columns.items():
+            width = len(column['elements']) or 1
+            filename = os.path.join(self.path, column['file'])
+            with open(filename, 'ab') as f:
+                f.truncate(capacity * width * np.dtype(column['dtype']).itemsize)
+            shape = (capacity,) if name == 'time' else (capacity, width)
+            self._maps[name] = np.memmap(filename, dtype=column['dtype'], mode='r+', shape=shape)
+        self.capacity = capacity
+
+    def append(self, t: int, snapshot: dict[str, dict[str, np.ndarray]]) -> None:
+        if self.columns is None:
+            self._create(snapshot)
+        row = {name: snapshot[name.split('.')[0]][name.split('.')[1]] for name in self.columns if name != 'time'}
+        row['time'] = t
+        self._buffer.append(row)
+        if len(self._buffer) >= self.buffer_rows:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        if self.rows + len(self._buffer) > self.capacity:
+            for memmap in self._maps.values():
+                memmap.flush()
+            capacity = self.capacity
+            while self.rows + len(self._buffer) > capacity:
+                capacity *= 2
+            self._open(capacity)
+
+        start, stop = self.rows, self.rows + len(self._buffer)
+        for name, memmap in self._maps.items():
+            values = [row[name] for row in self._buffer]
+            memmap[start:stop] = values if name == 'time' else np.stack(values)
+            memmap.flush()
+
+        self.rows = stop
+        self._buffer = []
+        self._write_meta()
+
+    def _write_meta(self) -> None:
+        filename = os.path.join(self.path, 'meta.json')
+        with open(filename + '.tmp', 'w') as f:
+            json.dump({'rows': self.rows, 'capacity': self.capacity, 'columns': self.columns}, f)
+        os.replace(filename + '.tmp', filename)
+
+    def close(self) -> None:
+        self.flush()
+        self._maps = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __str__(self):
+        return f'Recorder ({self.path}, {self.rows} rows)'
+
+    def __repr__(self):
+        return self.__str__()
+
+class Recording:
+    """This class opens a recording read-only. Columns are memory-mapped, so slicing a
+    time range or an element only reads those pages from disk.
+    """
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        self.rows = meta['rows']
+        self.capacity = meta['capacity']
+        self.columns = meta['columns']
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def column(self, name: str) -> np.ndarray:
+        """Returns a (steps x elements) memory map of a column, or (steps,) for 'time'."""
+        column = self.columns[name]
+        width = len(column['elements']) or 1
+        shape = (self.capacity,) if name == 'time' else (self.capacity, width)
+        memmap = np.memmap(os.path.join(self.path, column['file']), dtype=column['dtype'], mode='r', shape=shape)
+        return memmap[:self.rows]
+
+    @property
+    def time(self) -> np.ndarray:
+        return self.column('time')
+
+    def element(self, name: str, name_id: str) -> np.ndarray:
+        """Returns the values of one element of a column over all steps."""
+        return self.column(name)[:, self.columns[name]['elements'].index(name_id)]
+
+    def groups(self) -> dict[str, tuple[np.ndarray, list[str]]]:
+        """Returns the (indices, name IDs) of every recorded group, e.g. for 'RegisterMap.from_groups'."""
+        groups = {}
+        for name, column in self.columns.items():
+            if name != 'time':
+                groups[name.split('.')[0]] = (np.asarray(column['indices'], dtype=int), column['elements'])
+        return groups
+
+    def slice(self, start: int = None, stop: int = None) -> dict[str, np.ndarray]:
+        """Returns all columns for the steps with start <= time < stop."""
+        time = self.time
+        begin = 0 if start is None else int(np.searchsorted(time, start, side='left'))
+        end = self.rows if stop is None else int(np.searchsorted(time, stop, side='left'))
+        return {name: self.column(name)[begin:end] for name in self.columns}
+
+    def __str__(self):
+        return f'Recording ({self.path}, {self.rows} rows)'
+
+    def __repr__(self):
+        return self.__str__()
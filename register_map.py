@@ -0,0 +1,157 @@
+from typing import TYPE_CHECKING
+import csv
+import json
+import numpy as np
+from watersim.codec import RegisterCodec
+
+if TYPE_CHECKING:
+    from watersim.base import Epanet
+
+class Field:
+    """One quantity of one element type (a group of the 'Epanet.snapshot()') in a register map.
+
+    Values are multiplied by 'scale' before they are encoded, which allows storing
+    e.g. a level in centimetres in an integer register.
+    """
+    def __init__(self, group: str, quantity: str, dtype: str = 'float32', scale: float = 1.0, word_order: str = 'little'):
+        self.group = group
+        self.quantity = quantity
+        self.scale = scale
+        self.codec = RegisterCodec(dtype, word_order)
+
+    def __str__(self):
+        return f'Field ({self.group}.{self.quantity}, {self.codec.dtype}, x{self.scale})'
+
+    def __repr__(self):
+        return self.__str__()
+
+DEFAULT_SCHEMA = [
+    Field('node', 'pressure'),
+    Field('node', 'head'),
+    Field('tank', 'min_level'),
+    Field('tank', 'max_level'),
+    Field('pipe', 'status', dtype='uint16'),
+    Field('pump', 'power'),
+    Field('valve', 'setting')
+]
+
+class Block:
+    """The registers that hold one field for all elements of its group.
+
+    'start' and 'stop' are the byte offsets of the block in the packed payload.
+    """
+    def __init__(self, field: Field, indices: np.ndarray, name_ids: list[str], address: int, start: int):
+        self.field = field
+        self.indices = indices
+        self.name_ids = name_ids
+        self.address = address
+        self.count = len(indices) * field.codec.registers_per_value
+        self.start = start
+        self.stop = start + self.count * 2
+
+    def __str__(self):
+        return f'Block ({self.field.group}.{self.field.quantity} @ {self.address}, {self.count} registers)'
+
+    def __repr__(self):
+        return self.__str__()
+
+class RegisterMap:
+    """This class lays out the fields of a schema over consecutive holding registers,
+    starting at 'address', for the topology of a network.
+
+    Each field gets one block with a value per element, in toolkit index order. The
+    layout only depends on the topology and the schema, so the PLC side can use the
+    exported map for as long as the network is not edited.
+    """
+    def __init__(self, d: 'Epanet', schema: list[Field] = DEFAULT_SCHEMA, address: int = 0):
+        topology = d.topology
+        groups = {'node': (topology.node_indices, topology.node_name_ids)}
+        for group, indices in topology.nodes_by_type.items():
+            groups[group] = (indices, [topology.node_name_ids[i - 1] for i in indices.tolist()])
+        for group, indices in topology.links_by_type.items():
+            groups[group] = (indices, [topology.link_name_ids[i - 1] for i in indices.tolist()])
+        self._layout(groups, schema, address)
+
+    @classmethod
+    def from_groups(cls, groups: dict[str, tuple[np.ndarray, list[str]]], schema: list[Field] = DEFAULT_SCHEMA, address: int = 0) -> 'RegisterMap':
+        """Creates a map from the (indices, name IDs) of each group instead of a loaded network.
+
+        Groups that are missing get an empty block.
+        """
+        register_map = cls.__new__(cls)
+        register_map._layout(groups, schema, address)
+        return register_map
+
+    def _layout(self, groups: dict[str, tuple[np.ndarray, list[str]]], schema: list[Field], address: int) -> None:
+        self.address = address
+        self.blocks = []
+
+        for field in schema:
+            indices, name_ids = groups.get(field.group, (np.zeros(0, dtype=int), []))
+            block = Block(field, indices, list(name_ids), address, (address - self.address) * 2)
+            self.blocks.append(block)
+            address += block.count
+
+        self.count = address - self.address
+
+    def pack(self, snapshot: dict[str, dict[str, np.ndarray]], out: bytearray = None) -> bytearray:
+        """Encodes a snapshot into one contiguous register payload of 'count' registers.
+
+        The payload can be written in one go with 'ModbusClient.write_register_bytes'.
+        Pass 'out' to reuse a buffer between steps.
+        """
+        out = bytearray(self.count * 2) if out is None else out
+        for block in self.blocks:
+            field = block.field
+            values = np.asarray(snapshot[field.group][field.quantity], dtype=float) * field.scale
+            if field.codec.dtype.kind in 'iu':
+                values = np.rint(values)
+            out[block.start:block.stop] = field.codec.encode_bytes(values)
+        return out
+
+    def unpack(self, data: bytes) -> dict[str, dict[str, np.ndarray]]:
+        """Decodes a register payload back into a snapshot of the mapped fields."""
+        snapshot = {}
+        for block in self.blocks:
+            field = block.field
+            values = field.codec.decode_bytes(data[block.start:block.stop])
+            group = snapshot.setdefault(field.group, {'index': block.indices})
+            group[field.quantity] = values / field.scale if field.scale != 1.0 else values
+        return snapshot
+
+    def rows(self) -> list[dict]:
+        """Returns one row per mapped value with its address and encoding."""
+        rows = []
+        for block in self.blocks:
+            field = block.field
+            size = field.codec.registers_per_value
+            for i, (index, name_id) in enumerate(zip(block.indices.tolist(), block.name_ids)):
+                rows.append({
+                    'address': block.address + i * size,
+                    'registers': size,
+                    'group': field.group,
+                    'quantity': field.quantity,
+                    'name_id': name_id,
+                    'index': index,
+                    'dtype': str(field.codec.dtype),
+                    'word_order': field.codec.word_order,
+                    'scale': field.scale
+                })
+        return rows
+
+    def to_json(self, path: str) -> None:
+        with open(path, 'w') as f:
+            json.dump({'address': self.address, 'count': self.count, 'registers': self.rows()}, f, indent=2)
+
+    def to_csv(self, path: str) -> None:
+        rows = self.rows()
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ['address'])
+            writer.writeheader()
+            writer.writerows(rows)
+
+    def __str__(self):
+        return f'RegisterMap ({len(self.blocks)} blocks, {self.count} registers @ {self.address})'
+
+    def __repr__(self):
+        return self.__str__()
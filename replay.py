@@ -0,0 +1,106 @@
+import time
+import numpy as np
+from pyModbusTCP.server import DataBank
+from watersim.bridge import SimulationDataBank
+from watersim.recorder import Recording
+from watersim.register_map import RegisterMap
+
+class Replayer:
+    """This class feeds a recorded run into a Modbus server data bank, without running
+    the hydraulic solver.
+
+    The recording is played back at 'speed' times real time and the data bank is
+    updated 'rate' times per wall-clock second. With 'interpolate', float values are
+    interpolated linearly between the two recorded steps around the current time;
+    integer fields (e.g. statuses) keep the value of the earlier step. With
+    'speed=None' every recorded step is published once, as fast as possible. With
+    'loop' the playback starts over after the last step.
+    """
+    def __init__(self, recording: Recording, register_map: RegisterMap, data_bank: DataBank,
+                 speed: float | None = 1.0, rate: float = 10.0, loop: bool = False, interpolate: bool = True):
+        self.recording = recording
+        self.register_map = register_map
+        self.data_bank = data_bank
+        self.speed = speed
+        self.rate = rate
+        self.loop = loop
+        self.interpolate = interpolate
+        self.time = np.asarray(recording.time)
+        self.columns = {
+            (block.field.group, block.field.quantity): recording.column(f'{block.field.group}.{block.field.quantity}')
+            for block in register_map.blocks if block.count
+        }
+        self.integer = {(block.field.group, block.field.quantity) for block in register_map.blocks if block.field.codec.dtype.kind in 'iu'}
+        self._scratch = bytearray(register_map.count * 2)
+        self.updates = 0
+
+    def snapshot_at(self, t: float) -> dict[str, dict[str, np.ndarray]]:
+        """Returns the (interpolated) snapshot at simulation time 't'."""
+        row = int(np.searchsorted(self.time, t, side='right')) - 1
+        row = min(max(row, 0), len(self.time) - 1)
+        fraction = 0.0
+        if self.interpolate and row + 1 < len(self.time) and self.time[row + 1] > self.time[row]:
+            fraction = (t - self.time[row]) / (self.time[row + 1] - self.time[row])
+
+        snapshot = {}
+        for block in self.register_map.blocks:
+            key = (block.field.group, block.field.quantity)
+            if key not in self.columns:
+                values = np.zeros(len(block.indices))
+            elif fraction > 0 and key not in self.integer:
+                column = self.columns[key]
+                values = column[row] + (column[row + 1] - column[row]) * fraction
+            else:
+                values = self.columns[key][row]
+            snapshot.setdefault(key[0], {})[key[1]] = values
+        return snapshot
+
+    def publish(self, snapshot: dict[str, dict[str, np.ndarray]]) -> None:
+        if isinstance(self.data_bank, SimulationDataBank):
+            self.data_bank.publish(snapshot)
+        else:
+            data = self.register_map.pack(snapshot, out=self._scratch)
+            self.data_bank.set_holding_registers(self.register_map.address, np.frombuffer(data, dtype='>u2').tolist())
+        self.updates += 1
+
+    def _run_steps(self, stop: float) -> None:
+        while time.perf_counter() < stop:
+            for t in self.time.tolist():
+                self.publish(self.snapshot_at(t))
+                if time.perf_counter() >= stop:
+                    return
+            if not self.loop:
+                return
+
+    def run(self, duration: float = None) -> None:
+        """Plays the recording for 'duration' wall-clock seconds, or until it ends."""
+        if len(self.time) == 0:
+            return
+        start = time.perf_counter()
+        stop = start + duration if duration is not None else float('inf')
+        if self.speed is None:
+            self._run_steps(stop)
+            return
+
+        first, span = float(self.time[0]), float(self.time[-1] - self.time[0])
+        update = 0
+        while True:
+            now = time.perf_counter()
+            if now >= stop:
+                return
+            elapsed = (now - start) * self.speed
+            if elapsed > span:
+                if not self.loop:
+                    self.publish(self.snapshot_at(first + span))
+                    return
+                elapsed = elapsed % span if span > 0 else 0.0
+            self.publish(self.snapshot_at(first + elapsed))
+
+            update += 1
+            time.sleep(max(0.0, start + update / self.rate - time.perf_counter()))
+
+    def __str__(self):
+        return f'Replayer ({len(self.time)} steps, {self.updates} updates)'
+
+    def __repr__(self):
+        return self.__str__()
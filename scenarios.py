@@ -0,0 +1,135 @@
+import numpy as np
+import os
+import shutil
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import resource_tracker, shared_memory
+from watersim import base
+
+class Scenario:
+    """A what-if run of a network.
+
+    'changes' is a list of (method, args) pairs that are applied to the loaded
+    'Epanet' before the run, e.g. ('setOptionsPatternDemandMultiplier', (1.2,)) or
+    ('setLinkInitialStatus', (pump_index, 0)).
+    """
+    def __init__(self, name: str, inp_file: str, duration: int, hydraulic_step: int = 60 * 10, changes: list[tuple[str, tuple]] = ()):
+        self.name = name
+        self.inp_file = inp_file
+        self.duration = duration
+        self.hydraulic_step = hydraulic_step
+        self.changes = list(changes)
+
+    @property
+    def steps(self) -> int:
+        return self.duration // self.hydraulic_step + 1
+
+    def __str__(self):
+        return f'Scenario ({self.name}, {self.steps} steps)'
+
+    def __repr__(self):
+        return self.__str__()
+
+def _columns(snapshot: dict[str, dict[str, np.ndarray]]) -> list[tuple[str, int, int]]:
+    columns, start = [], 0
+    for group, values in snapshot.items():
+        for quantity, array in values.items():
+            if quantity != 'index':
+                columns.append((f'{group}.{quantity}', start, start + array.size))
+                start += array.size
+    return columns
+
+def _run_scenario(scenario: Scenario) -> tuple[str, int, list[tuple[str, int, int]]]:
+    """Runs a scenario in a worker process and streams one row per hydraulic step into
+    a shared memory block. Returns the block name, the number of rows and the columns.
+    """
+    # The toolkit writes temporary files next to the input file, so every run works on its own copy.
+    with tempfile.TemporaryDirectory() as directory:
+        inp_file = shutil.copy(scenario.inp_file, os.path.join(directory, os.path.basename(scenario.inp_file)))
+        return _run_scenario_file(scenario, inp_file)
+
+def _run_scenario_file(scenario: Scenario, inp_file: str) -> tuple[str, int, list[tuple[str, int, int]]]:
+    d = base.Epanet(inp_file, display_msg=False)
+    shm, data = None, None
+    try:
+        for method, args in scenario.changes:
+            getattr(d, method)(*args)
+        d.setTimeSimulationDuration(scenario.duration)
+        d.setTimeHydraulicStep(scenario.hydraulic_step)
+
+        d.openHydraulicAnalysis()
+        d.initializeHydraulicAnalysis()
+
+        rows = 0
+        while True:
+            t = d.runHydraulicAnalysis()
+            # Intermediate solver steps (tank events, controls) are not recorded.
+            if t % scenario.hydraulic_step == 0 and rows < scenario.steps:
+                snapshot = d.snapshot()
+                row = np.concatenate([[t]] + [values[quantity].ravel() for values in snapshot.values() for quantity in values if quantity != 'index'])
+                if shm is None:
+                    columns = _columns(snapshot)
+                    shm = shared_memory.SharedMemory(create=True, size=scenario.steps * row.size * 8)
+                    data = np.ndarray((scenario.steps, row.size), dtype=np.float64, buffer=shm.buf)
+                data[rows] = row
+                rows += 1
+            if d.nextHydraulicAnalysisStep() <= 0:
+                break
+
+        d.closeHydraulicAnalysis()
+        if shm is None:
+            raise ValueError(f'{scenario} recorded no steps, check its duration and hydraulic step')
+        data = None
+        shm.close()
+        # The runner owns the block from here on and unlinks it after collecting.
+        resource_tracker.unregister(shm._name, 'shared_memory')
+        return shm.name, rows, columns
+
+    except BaseException:
+        data = None
+        if shm is not None:
+            shm.close()
+            shm.unlink()
+        raise
+
+    finally:
+        d.unload()
+
+class ScenarioRunner:
+    """This class fans scenarios out over a process pool, with one toolkit instance per
+    worker process.
+
+    Workers write their per-step snapshots into shared memory instead of pickling
+    them. The runner collects them into a columnar store: per scenario a dict with a
+    'time' column and one (steps x elements) array per 'group.quantity'.
+    """
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers
+
+    def _collect(self, name: str, rows: int, columns: list[tuple[str, int, int]]) -> dict[str, np.ndarray]:
+        shm = shared_memory.SharedMemory(name=name)
+        try:
+            width = 1 + (columns[-1][2] if columns else 0)
+            data = np.ndarray((rows, width), dtype=np.float64, buffer=shm.buf)
+            result = {'time': data[:, 0].astype(np.int64)}
+            for key, start, stop in columns:
+                result[key] = data[:, 1 + start:1 + stop].copy()
+            del data
+            return result
+        finally:
+            shm.close()
+            shm.unlink()
+
+    def run(self, scenarios: list[Scenario]) -> dict[str, dict[str, np.ndarray]]:
+        results, errors = {}, []
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {pool.submit(_run_scenario, scenario): scenario for scenario in scenarios}
+            for future in as_completed(futures):
+                # Keep collecting after a failure, so no shared memory is left behind.
+                if future.exception() is not None:
+                    errors.append(future.exception())
+                    continue
+                results[futures[future].name] = self._collect(*future.result())
+        if errors:
+            raise errors[0]
+        return {scenario.name: results[scenario.name] for scenario in scenarios}
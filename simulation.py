@@ -0,0 +1,177 @@
+import numpy as np
+from functools import wraps
+from epyt import epanet
+from watersim.metrics import METRICS
+
+class Topology:
+    """Holds the names, indices and types of all nodes and links of a network.
+
+    Indices are the 1-based toolkit indices. Nodes are grouped into 'junction',
+    'reservoir' and 'tank', links into 'pipe', 'pump' and 'valve'.
+    """
+    def __init__(self, d: epanet):
+        self.node_name_ids = list(d.getNodeNameID())
+        self.node_types = list(d.getNodeType())
+        self.node_indices = np.arange(1, len(self.node_name_ids) + 1)
+        self.node_index = {name_id: i for i, name_id in enumerate(self.node_name_ids, start=1)}
+
+        self.link_name_ids = list(d.getLinkNameID())
+        self.link_types = list(d.getLinkType())
+        self.link_indices = np.arange(1, len(self.link_name_ids) + 1)
+        self.link_index = {name_id: i for i, name_id in enumerate(self.link_name_ids, start=1)}
+
+        self.nodes_by_type = {
+            group: self.node_indices[[node_type == group.upper() for node_type in self.node_types]]
+            for group in ('junction', 'reservoir', 'tank')
+        }
+        self.link_groups = [self._link_group(link_type) for link_type in self.link_types]
+        self.links_by_type = {
+            group: self.link_indices[[link_group == group for link_group in self.link_groups]]
+            for group in ('pipe', 'pump', 'valve')
+        }
+
+    @staticmethod
+    def _link_group(link_type: str) -> str:
+        if link_type in ('PIPE', 'CVPIPE'):
+            return 'pipe'
+        if link_type == 'PUMP':
+            return 'pump'
+        return 'valve'
+
+    def __str__(self):
+        return f'Topology ({len(self.node_name_ids)} nodes, {len(self.link_name_ids)} links)'
+
+    def __repr__(self):
+        return self.__str__()
+
+class Epanet(epanet):
+    """This class extends the existing 'epanet' class with additional functionality
+    to get the relevant node and link values.
+
+    The network topology is indexed once when the input file loads and is only
+    rebuilt after the network is edited through the toolkit API. 'inputs_version'
+    is incremented by every toolkit call that changes the network or its inputs
+    (all setters except the time parameters).
+    """
+    def __init__(self, *argv, **kwargs):
+        self._topology = None
+        self.inputs_version = 0
+        super().__init__(*argv, **kwargs)
+        if argv:
+            self._topology = Topology(self)
+
+    @property
+    def topology(self) -> Topology:
+        if self._topology is None:
+            self._topology = Topology(self)
+        return self._topology
+
+    def _node_values(self, code: int) -> np.ndarray:
+        return np.asarray(self.api.ENgetnodevalues(code))
+
+    def _link_values(self, code: int) -> np.ndarray:
+        return np.asarray(self.api.ENgetlinkvalues(code))
+
+    def snapshot(self) -> dict[str, dict[str, np.ndarray]]:
+        """Returns the current node and link values grouped by element type.
+
+        Each quantity is fetched for all nodes or links with a single toolkit call
+        and then sliced per element type. Every group also holds the (1-based)
+        toolkit 'index' of its elements.
+        """
+        with METRICS.time('collect'):
+            c = self.ToolkitConstants
+            topology = self.topology
+            tanks = topology.nodes_by_type['tank']
+            pipes = topology.links_by_type['pipe']
+            pumps = topology.links_by_type['pump']
+            valves = topology.links_by_type['valve']
+
+            heads = self._node_values(c.EN_HEAD)
+
+            return {
+                'node': {
+                    'index': topology.node_indices,
+                    'pressure': self._node_values(c.EN_PRESSURE),
+                    'head': heads
+                },
+                'tank': {
+                    'index': tanks,
+                    'head': heads[tanks - 1],
+                    'min_level': self._node_values(c.EN_MINLEVEL)[tanks - 1],
+                    'max_level': self._node_values(c.EN_MAXLEVEL)[tanks - 1]
+                },
+                'pipe': {
+                    'index': pipes,
+                    'status': self._link_values(c.EN_STATUS)[pipes - 1].astype(int)
+                },
+                'pump': {
+                    'index': pumps,
+                    'power': self._link_values(c.EN_PUMP_POWER)[pumps - 1]
+                },
+                'valve': {
+                    'index': valves,
+                    'setting': self._link_values(c.EN_SETTING)[valves - 1]
+                }
+            }
+
+    @property
+    def tank_heads(self) -> list[float]:
+        indices = self.topology.nodes_by_type['tank']
+        return self._node_values(self.ToolkitConstants.EN_HEAD)[indices - 1].tolist()
+
+    @property
+    def tank_min_water_levels(self) -> list[float]:
+        indices = self.topology.nodes_by_type['tank']
+        return self._node_values(self.ToolkitConstants.EN_MINLEVEL)[indices - 1].tolist()
+    
+    @property
+    def tank_max_water_levels(self) -> list[float]:
+        indices = self.topology.nodes_by_type['tank']
+        return self._node_values(self.ToolkitConstants.EN_MAXLEVEL)[indices - 1].tolist()
+
+    @property
+    def pipe_statuses(self) -> list[int]:
+        indices = self.topology.links_by_type['pipe']
+        return self._link_values(self.ToolkitConstants.EN_STATUS)[indices - 1].astype(int).tolist()
+   
+    @property
+    def pump_powers(self) -> list[float]:
+        indices = self.topology.links_by_type['pump']
+        return self._link_values(self.ToolkitConstants.EN_PUMP_POWER)[indices - 1].tolist()
+
+def _invalidates_topology(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self._topology = None
+        self.inputs_version += 1
+        return result
+    return wrapper
+
+def _changes_inputs(method):
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        result = method(self, *args, **kwargs)
+        self.inputs_version += 1
+        return result
+    return wrapper
+
+# Toolkit methods that add, remove, rename or retype nodes and links.
+TOPOLOGY_EDITS = [
+    name for name in dir(epanet)
+    if name.startswith(('addNode', 'addLink', 'deleteNode', 'deleteLink', 'setNodeType', 'setLinkType'))
+    or name in ('setNodeNameID', 'setLinkNameID', 'loadEPANETFile', 'createProject', 'deleteProject', 'unload')
+]
+
+# Toolkit methods that change demands, settings, controls and other inputs.
+INPUT_EDITS = [
+    name for name in dir(epanet)
+    if name.startswith(('set', 'add', 'delete')) and not name.startswith('setTime') and name not in TOPOLOGY_EDITS
+]
+
+for name in TOPOLOGY_EDITS:
+    setattr(Epanet, name, _invalidates_topology(getattr(epanet, name)))
+
+for name in INPUT_EDITS:
+    setattr(Epanet, name, _changes_inputs(getattr(epanet, name)))
@@ -0,0 +1,119 @@
+from typing import TYPE_CHECKING
+import time
+import numpy as np
+from watersim.metrics import METRICS
+
+if TYPE_CHECKING:
+    from watersim.base import Epanet
+
+class IncrementalStepper:
+    """This class advances an 'Epanet' in fixed hydraulic steps, but only calls the solver
+    when something can have changed.
+
+    The clock advances by the network's hydraulic step on every 'step'. The solver
+    is skipped (and the last solved snapshot is served) while the network is steady:
+    no inputs changed through the toolkit API ('Epanet.inputs_version'), and every
+    tank head changed by less than 'tolerance' per step between the last two solves.
+    After at most 'max_skip' skipped steps, or as soon as the network is not steady,
+    the solver is advanced to the current time in one go. The toolkit still stops at
+    every pattern, control and tank event on the way, so time stays consistent, but
+    tank levels are integrated over the longer span in one step. To let the span grow
+    past the reporting step, 'open' raises the reporting step to 'max_skip' hydraulic
+    steps and 'close' restores it.
+    """
+    def __init__(self, d: 'Epanet', tolerance: float = 1e-3, max_skip: int = 8):
+        self.d = d
+        self.tolerance = tolerance
+        self.max_skip = max_skip
+        self.hydraulic_step = None
+        self.reporting_step = None
+        self.time = 0
+        self.solved_time = None
+        self.snapshot = None
+        self.steady = False
+        self.steps = 0
+        self.solves = 0
+        self.skipped = 0
+        self.solve_time = 0.0
+        self._heads = None
+        self._inputs_version = None
+
+    def open(self) -> None:
+        d = self.d
+        self.hydraulic_step = int(d.getTimeHydraulicStep())
+        self.reporting_step = int(d.getTimeReportingStep())
+        # The toolkit also stops at every reporting time, which would cap the skipped span.
+        span = self.max_skip * self.hydraulic_step
+        if d.getTimeSimulationDuration() < span:
+            d.setTimeSimulationDuration(span)
+        d.setTimeReportingStep(max(span, self.reporting_step))
+        d.openHydraulicAnalysis()
+        d.initializeHydraulicAnalysis()
+        self.time = 0
+        self.solved_time = None
+
+    def close(self) -> None:
+        self.d.setTimeHydraulicStep(self.hydraulic_step)
+        self.d.setTimeReportingStep(self.reporting_step)
+        self.d.closeHydraulicAnalysis()
+
+    def _solve(self) -> None:
+        start = time.perf_counter()
+        with METRICS.time('solve'):
+            t = self.d.runHydraulicAnalysis()
+        self.snapshot = self.d.snapshot()
+        self.solve_time += time.perf_counter() - start
+        self.solves += 1
+        METRICS.count('solves')
+
+        heads = self.snapshot['tank']['head']
+        if self._heads is None or self.solved_time is None or t <= self.solved_time:
+            self.steady = False
+        else:
+            steps = (t - self.solved_time) / self.hydraulic_step
+            self.steady = bool(np.all(np.abs(heads - self._heads) <= self.tolerance * steps))
+        self._heads = heads
+        self.solved_time = t
+        self._inputs_version = self.d.inputs_version
+
+    def _advance(self, target: int) -> None:
+        d = self.d
+        # Keep the simulation running for as long as the caller keeps stepping.
+        if d.getTimeSimulationDuration() < target + self.hydraulic_step:
+            d.setTimeSimulationDuration(target + self.hydraulic_step)
+        while self.solved_time < target:
+            d.setTimeHydraulicStep(target - self.solved_time)
+            start = time.perf_counter()
+            tstep = d.nextHydraulicAnalysisStep()
+            self.solve_time += time.perf_counter() - start
+            if tstep <= 0:
+                break
+            self._solve()
+        d.setTimeHydraulicStep(self.hydraulic_step)
+
+    def step(self) -> int:
+        """Advances the clock by one hydraulic step and returns the time of the served snapshot.
+
+        While steps are skipped, that is the time of the last solve ('solved_time'),
+        which lags the clock ('time').
+        """
+        target = self.time
+        if self.solved_time is None:
+            self._solve()
+        elif self.solved_time < target:
+            changed = self.d.inputs_version != self._inputs_version
+            if changed or not self.steady or target - self.solved_time >= self.max_skip * self.hydraulic_step:
+                self._advance(target)
+            else:
+                self.skipped += 1
+                METRICS.count('skipped_steps')
+        self.steps += 1
+        self.time += self.hydraulic_step
+        return self.solved_time
+
+    def __str__(self):
+        per_step = self.solve_time / self.steps * 1e3 if self.steps else 0.0
+        return f'IncrementalStepper ({self.steps} steps, {self.solves} solves, {self.skipped} skipped, {per_step:.3f} ms/step)'
+
+    def __repr__(self):
+        return self.__str__()
@@ -1,96 +1,82 @@
-from epyt import epanet
+import numpy as np
+from array import array
+
+from watersim.base import Epanet as BaseEpanet
 
 from pymodbus.client import ModbusTcpClient
-from pymodbus.payload import BinaryPayloadDecoder, BinaryPayloadBuilder
-from pymodbus.constants import Endian
+from watersim.codec import FLOAT32
 
-class Epanet(epanet):
+class Epanet(BaseEpanet):
     """This class extends the existing 'epanet' class with additional functionality
     to get the relevant node and link values.
     """    
     def get_node_values(self) -> dict:
-        node_values = {}
-
-        for name_id in self.getNodeNameID():
-            node_index = self.getNodeIndex(name_id)
-            node_type = self.getNodeType(node_index)
-
-            node_values[name_id] = {
-                'type': node_type,
-                'pressure': round(self.getNodePressure(node_index), 5),
-                'head': round(self.getNodeHydraulicHead(node_index), 5),
-                **({
-                    'min_level': float(self.getNodeTankMinimumWaterLevel(node_index)),
-                    'max_level': float(self.getNodeTankMaximumWaterLevel(node_index))
-                } if node_type == 'TANK' else {})
-            }
+        snapshot = self.snapshot()
+        nodes, tanks = snapshot['node'], snapshot['tank']
+        name_ids = self.topology.node_name_ids
+
+        node_values = {
+            name_id: {'type': node_type, 'pressure': pressure, 'head': head}
+            for name_id, node_type, pressure, head in zip(
+                name_ids,
+                self.topology.node_types,
+                np.round(nodes['pressure'], 5).tolist(),
+                np.round(nodes['head'], 5).tolist()
+            )
+        }
+
+        for node_index, min_level, max_level in zip(tanks['index'].tolist(), tanks['min_level'].tolist(), tanks['max_level'].tolist()):
+            node_values[name_ids[node_index - 1]].update({'min_level': min_level, 'max_level': max_level})
 
         return node_values
 
     def get_link_values(self) -> dict:
-        link_values = {}
-
-        for name_id in self.getLinkNameID():
-            link_index = self.getLinkIndex(name_id)
-            link_type = self.getLinkType(link_index)
+        snapshot = self.snapshot()
+        name_ids = self.topology.link_name_ids
+        link_values = {name_id: {'type': link_type} for name_id, link_type in zip(name_ids, self.topology.link_types)}
 
-            link_values[name_id] = {
-                'type': link_type,
-                **({'status': self.getLinkStatus(link_index)} if link_type == 'PIPE' else {}),
-                **({'power': self.getLinkPumpPower(link_index)} if link_type == 'PUMP' else {}),
-                **({'setting': self.getLinkSettings(link_index)} if link_type == 'VALVE' else {})
-            }
+        for group, quantity in (('pipe', 'status'), ('pump', 'power'), ('valve', 'setting')):
+            for link_index, value in zip(snapshot[group]['index'].tolist(), snapshot[group][quantity].tolist()):
+                link_values[name_ids[link_index - 1]][quantity] = value
 
         return link_values
     
     def get_node_values_modbus(self) -> list[float]:
+        c = self.ToolkitConstants
+        pressures = np.round(self._node_values(c.EN_PRESSURE), 5).tolist()
+        heads = np.round(self._node_values(c.EN_HEAD), 5).tolist()
+        min_levels = self._node_values(c.EN_MINLEVEL).tolist()
+        max_levels = self._node_values(c.EN_MAXLEVEL).tolist()
         node_values_modbus = []
 
-        for name_id in self.getNodeNameID():
-            node_index = self.getNodeIndex(name_id)
-            node_type = self.getNodeType(node_index)
-
-            node_values_modbus.extend([
-                round(self.getNodePressure(node_index), 5),
-                round(self.getNodeHydraulicHead(node_index), 5)
-            ])
+        for i, node_type in enumerate(self.topology.node_types):
+            node_values_modbus.extend([pressures[i], heads[i]])
 
             match node_type:
                 case 'TANK':
-                    node_values_modbus.extend([
-                        float(self.getNodeTankMinimumWaterLevel(node_index)),
-                        float(self.getNodeTankMaximumWaterLevel(node_index))
-                    ])
+                    node_values_modbus.extend([min_levels[i], max_levels[i]])
                 case _:
                     pass
 
         return node_values_modbus
 
     def get_link_values_modbus(self) -> list:
-        link_values_modbus = []
-
-        for name_id in self.getLinkNameID():
-            link_index = self.getLinkIndex(name_id)
-            link_type = self.getLinkType(link_index)
-
-            match link_type:
-                case 'PIPE':
-                    link_values_modbus.extend(int(self.getLinkStatus(link_index)))
-                case 'PUMP':
-                    link_values_modbus.extend(self.getLinkPumpPower(link_index))
-                case 'VALVE':
-                    link_values_modbus.extend(self.getLinkSettings(link_index))
-                case _:
-                    pass
-
-        return link_values_modbus
+        c = self.ToolkitConstants
+        values = {
+            'pipe': self._link_values(c.EN_STATUS).astype(int).tolist(),
+            'pump': self._link_values(c.EN_PUMP_POWER).tolist(),
+            'valve': self._link_values(c.EN_SETTING).tolist()
+        }
+        return [values[link_group][i] for i, link_group in enumerate(self.topology.link_groups)]
 
 class ModbusClient(ModbusTcpClient):
     """This class extends the existing 'ModbusTcpClient' class with additional functionality
     for reading and writing float values.
     """
     class ModbusFloatResponse:
-        def __init__(self, floats: list[float]) -> None:
+        __slots__ = ('floats',)
+
+        def __init__(self, floats: array) -> None:
             self.floats = floats
         
         def __getitem__(self, index: int) -> float:
@@ -99,20 +85,21 @@ class ModbusClient(ModbusTcpClient):
         def __len__(self) -> int:
             return len(self.floats)
 
-    def read_floats(self, address: int, count: int = 1, slave: int = 1) -> ModbusFloatResponse:
+    def read_floats(self, address: int, count: int = 1, slave: int = 1, out: ModbusFloatResponse = None) -> ModbusFloatResponse:
+        """Reads 'count' floats. With 'out' (of exactly 'count' floats) they are decoded into
+        that response, which is returned.
+        """
+        if out is not None and len(out) != count:
+            raise ValueError(f'ModbusFloatResponse of {len(out)} floats can\'t hold a read of {count} floats')
         result = self.read_holding_registers(address, count * 2, slave=slave)
-        decoder = BinaryPayloadDecoder.fromRegisters(result.registers, byteorder=Endian.BIG, wordorder=Endian.LITTLE)
-        return self.ModbusFloatResponse([decoder.decode_32bit_float() for _ in range(count)])
+        data = np.asarray(result.registers, dtype='>u2').tobytes()
+        if out is None:
+            return self.ModbusFloatResponse(array('f', FLOAT32.decode_bytes(data).tobytes()))
+        FLOAT32.decode_bytes(data, out=np.frombuffer(out.floats, dtype=np.float32))
+        return out
 
     def write_float(self, address: int, value: float, slave: int = 1) -> None:
-        builder = BinaryPayloadBuilder(byteorder=Endian.BIG, wordorder=Endian.LITTLE)
-        builder.add_32bit_float(value)
-        register = builder.to_registers()
-        self.write_registers(address, register, slave=slave)
+        self.write_registers(address, FLOAT32.encode([value]), slave=slave)
 
     def write_floats(self, address: int, values: list[float], slave: int = 1) -> None:
-        builder = BinaryPayloadBuilder(byteorder=Endian.BIG, wordorder=Endian.LITTLE)
-        for value in values:
-            builder.add_32bit_float(value)
-        registers = builder.to_registers()
-        self.write_registers(address, registers, slave=slave)
+        self.write_registers(address, FLOAT32.encode(values), slave=slave)
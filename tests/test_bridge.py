@@ -0,0 +1,25 @@
+import numpy as np
+from watersim.bridge import Setpoint, SimulationDataBank
+from watersim.register_map import Field, RegisterMap
+
+def make_data_bank() -> SimulationDataBank:
+    groups = {'pipe': (np.array([1, 2, 3]), ['P1', 'P2', 'P3'])}
+    register_map = RegisterMap.from_groups(groups, schema=[Field('pipe', 'status', dtype='uint16')], address=10)
+    data_bank = SimulationDataBank(register_map, [Setpoint(13, 'setLinkStatus', 1, dtype='uint16')])
+    data_bank.publish({'pipe': {'index': groups['pipe'][0], 'status': np.array([1, 1, 0])}})
+    data_bank.set_holding_registers(13, [7])
+    return data_bank
+
+def test_read_inside_map():
+    assert make_data_bank().get_holding_registers(10, 3) == [1, 1, 0]
+
+def test_read_outside_map():
+    assert make_data_bank().get_holding_registers(13, 2) == [7, 0]
+
+def test_read_across_map_boundaries():
+    data_bank = make_data_bank()
+    assert data_bank.get_holding_registers(11, 3) == [1, 0, 7]
+    assert data_bank.get_holding_registers(8, 6) == [0, 0, 1, 1, 0, 7]
+
+def test_read_out_of_range():
+    assert make_data_bank().get_holding_registers(11, 0x10000) is None
@@ -0,0 +1,33 @@
+import multiprocessing
+import time
+from watersim.databank import SharedDataBank
+
+COUNT = 8192
+
+def _write(name: str, size: int, lock, stop) -> None:
+    data_bank = SharedDataBank(name, size, lock)
+    try:
+        value = 0
+        while not stop.is_set():
+            value = (value + 1) & 0xFFFF
+            data_bank.set_holding_registers(0, [value] * COUNT)
+    finally:
+        data_bank.close()
+
+def test_reads_are_never_torn():
+    data_bank = SharedDataBank(size=COUNT)
+    stop = multiprocessing.Event()
+    writer = multiprocessing.Process(target=_write, args=(data_bank.name, data_bank.size, data_bank.lock, stop), daemon=True)
+    writer.start()
+    try:
+        seen, deadline = set(), time.monotonic() + 1.0
+        while time.monotonic() < deadline:
+            values = data_bank.get_holding_registers(0, COUNT)
+            # Every write fills the whole range with one value, so a mix is a torn read.
+            assert len(set(values)) == 1, values
+            seen.add(values[0])
+        assert len(seen) > 1
+    finally:
+        stop.set()
+        writer.join(timeout=5)
+        data_bank.close()
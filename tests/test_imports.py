@@ -0,0 +1,26 @@
+import os
+import statistics
+import subprocess
+import sys
+import pytest
+
+benchmark_import = pytest.importorskip('watersim.benchmark_import', reason='the watersim package is not importable')
+TARGETS = benchmark_import.TARGETS
+
+# The directory that holds the imported 'watersim' package, whatever the checkout is called.
+ROOT = os.path.dirname(os.path.abspath(next(iter(sys.modules['watersim'].__path__))))
+
+# Times the import budgets of 'benchmark_import' are multiplied by, as a margin for slow machines.
+MARGIN = 2
+
+@pytest.mark.parametrize('module', list(TARGETS))
+def test_no_eager_imports(module):
+    _, forbidden = TARGETS[module]
+    code = f'import sys, {module}; print(*sorted(name for name in {forbidden!r} if name in sys.modules))'
+    result = subprocess.run([sys.executable, '-c', code], cwd=ROOT, capture_output=True, text=True, check=True)
+    assert result.stdout.split() == []
+
+def test_base_import_time():
+    budget, _ = TARGETS['watersim.base']
+    median = statistics.median(benchmark_import.import_time('watersim.base')[0] for _ in range(3))
+    assert median <= budget * MARGIN, f'importing watersim.base took {median:.1f} ms'
@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from pyModbusTCP.server import ModbusServer
+from watersim.base import ReadFloatsResponse
+from watersim.client import AsyncModbusClient, ModbusClient
+from watersim.codec import FLOAT32
+from watersim.pool import ConnectionPool
+
+PORT = 15503
+
+@pytest.fixture(scope='module')
+def server():
+    server = ModbusServer(host='127.0.0.1', port=PORT, no_block=True)
+    server.start()
+    server.data_bank.set_holding_registers(0, FLOAT32.encode([1.5, 2.5, 3.5, 4.5]))
+    yield server
+    server.stop()
+
+def test_reuse_out(server):
+    client = ModbusClient('127.0.0.1', port=PORT)
+    client.connect()
+    try:
+        out = ReadFloatsResponse.empty(4)
+        assert client.read_floats(0, 4, out=out) is out
+        assert list(out) == [1.5, 2.5, 3.5, 4.5]
+        assert client.read_floats(8, 4, out=out) is out
+        assert list(out) == [0.0, 0.0, 0.0, 0.0]
+    finally:
+        client.close()
+
+def test_reuse_out_with_smaller_count(server):
+    client = ModbusClient('127.0.0.1', port=PORT)
+    client.connect()
+    pool = ConnectionPool()
+    try:
+        out = ReadFloatsResponse.empty(4)
+        client.read_floats(0, 4, out=out)
+        with pytest.raises(ValueError):
+            client.read_floats(0, 2, out=out)
+        with pytest.raises(ValueError):
+            pool.read_floats('127.0.0.1', PORT, 0, 2, out=out)
+        assert list(out) == [1.5, 2.5, 3.5, 4.5]
+        assert list(client.read_floats(4, 2, out=ReadFloatsResponse.empty(2))) == [3.5, 4.5]
+    finally:
+        client.close()
+        pool.close()
+
+def test_async_reuse_out_with_smaller_count(server):
+    async def read():
+        client = AsyncModbusClient('127.0.0.1', port=PORT)
+        await client.connect()
+        try:
+            out = await client.read_floats(0, 4)
+            with pytest.raises(ValueError):
+                await client.read_floats(0, 2, out=out)
+            return list(await client.read_floats(0, 4, out=out))
+        finally:
+            client.close()
+    assert asyncio.run(read()) == [1.5, 2.5, 3.5, 4.5]